@@ -1,60 +1,34 @@
-import requests
 import time
 import os
+import argparse
+import asyncio
 import psycopg2
+from psycopg2.extras import execute_values
 from datetime import date, timedelta
+from pubg_api import BASE_URL, ClientePubgAsync, cliente_padrao
+from cache_partidas import obter_resumo, obter_resumo_async
+from metricas import iniciar_metricas, metricas
+from fila_jobs import (
+    TokenBucketBanco, aguardar_leases, concluir, contar_jobs, devolver, enfileirar,
+    finalizar_lote, garantir_fila, lote_padrao, nome_worker, reivindicar, reservar_lote, resumo_lote
+)
+from registro_jogadores import (
+    ausentes, carregar_registro, garantir_registro, indexar_por_id, lotes,
+    marcar_para_resolver, resolver_pendentes, url_por_ids
+)
+from ranking_materializado import atualizar_ranking_materializado
+from pubg_db import travar_esquema
 
-API_KEY = os.getenv("PUBG_API_KEY") or "SUA_CHAVE_AQUI"
 DATABASE_URL = os.getenv("DATABASE_URL")
-SHARD = "steam"
 
 # Início oficial da Temporada 41 (8 de abril de 2026)
 INICIO_TEMPORADA_41 = "2026-04-08T00:00:00Z"
 
-PLAYERS = {
-    "Adrian-Wan":"account.58beb24ada7346408942d42dc64c7901",
-    "MironoteuCool":"account.24b0600cbba342eab1546ae2881f50fa",
-    "FabioEspeto":"account.d8ccad228a4a417dad9921616d6c6bcd",
-    "Mamutag_Komander":"account.64c62d76cce74d0b99857a27975e350e",
-    "Robson_Foz":"account.8142e6d837254ee1bca954b719692f38",
-    "MEIRAA":"account.c3f37890e7534978abadaf4bae051390",
-    "EL-LOCORJ":"account.94ab932726fc4c64a03eb9797429baa3",
-    "SalaminhoKBD":"account.de093e200d3441a9b781a9717a017dd3",
-    "nelio_ponto_dev":"account.ad39c88ddf754d33a3dfeadc117c47df",
-    "CARNEIROOO":"account.8c0313f2148d47b7bffcde634f094445",
-    "Kowalski_PR":"account.b25200afe120424a839eb56dd2bc49cb",
-    "Zacouteguy":"account.a742bf1d5725467c91140cd0ed83c265",
-    "Sidors":"account.60ab21fad4094824a32dc404420b914d",
-    "Takato_Matsuki":"account.10d2403139bd4066a95dda1a3eefe1e8",
-    "cmm01":"account.80cedebb935242469fdd177454a52e0e",
-    "Petrala":"account.aadd1c378ff841219d853b4ad2646286",
-    "O-CARRASCO":"account.78c6f7bd39da4274b5a3196ac624e92e",
-    "DET4N4KA":"account.25ca8d1984854e01940a4509c595d9ff",
-    "LeandroTW2":"account.a868cc4764a6447bb8f72649c73f5dab",
-}
-
-HEADERS = {"Authorization": f"Bearer {API_KEY}", "Accept": "application/vnd.api+json"}
+# Downloads simultâneos de /matches no modo squad
+CONCORRENCIA_PADRAO = int(os.getenv("ANTI_CASUAL_CONCORRENCIA", 8))
 
 def get(url):
-    for attempt in range(3):
-        r = requests.get(url, headers=HEADERS)
-        if r.status_code == 200:
-            return r.json()
-        elif r.status_code == 429:
-            wait = int(r.headers.get("Retry-After", 10))
-            print(f"⏳ Rate limit atingido, aguardando {wait}s... (tentativa {attempt + 1}/3)")
-            time.sleep(wait)
-        elif r.status_code == 401:
-            print(f"❌ API Key inválida ou expirada.")
-            return None
-        elif r.status_code == 404:
-            print(f"⚠️ Recurso não encontrado: {url}")
-            return None
-        else:
-            print(f"❌ Erro {r.status_code} em {url} (tentativa {attempt + 1}/3)")
-            time.sleep(2)
-    print(f"❌ Falhou após 3 tentativas: {url}")
-    return None
+    return cliente_padrao().get_json(url)
 
 def get_segunda_feira():
     hoje = date.today()
@@ -70,7 +44,7 @@ def salvar_snapshot_bot_semanal(conn):
     sql = """
     INSERT INTO ranking_bot_semanal
     (nick, semana, partidas, kr, vitorias, kills, dano_medio, assists, headshots, revives, top10, kill_dist_max, score)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    VALUES %s
     ON CONFLICT (nick, semana) DO UPDATE SET
     partidas=EXCLUDED.partidas,
     kr=EXCLUDED.kr,
@@ -85,122 +59,398 @@ def salvar_snapshot_bot_semanal(conn):
     score=EXCLUDED.score
     """
 
-    for row in rows:
-        cur.execute(sql, (row[0], semana_atual) + row[1:])
+    execute_values(cur, sql, [(row[0], semana_atual) + row[1:] for row in rows])
 
     conn.commit()
     cur.close()
     print(f"📊 Snapshot semanal do ranking_bot salvo para semana de {semana_atual}")
 
+def classificar_partida(resumo):
+    """Classifica a partida (um ResumoPartida) uma única vez para todos os jogadores dela.
+
+    Retorna "antiga", "modo_errado", "casual" ou "nao_casual".
+    """
+    if (resumo.created_at or "") < INICIO_TEMPORADA_41:
+        return "antiga"
+    if resumo.game_mode != "squad":
+        return "modo_errado"
+    if resumo.match_type == "casual" or resumo.humanos <= 12:
+        return "casual"
+    return "nao_casual"
+
+def imprimir_classificacao(match_id, categoria, resumo):
+    if categoria == "antiga":
+        print(f"    ⏩ {match_id} → partida antiga ({resumo.created_at}), ignorando")
+    elif categoria == "modo_errado":
+        print(f"    ❌ {match_id} → modo errado ({resumo.game_mode}), ignorando")
+    elif categoria == "casual":
+        print(f"    ✅ {match_id} → casual/bots (matchType={resumo.match_type}, humanos={resumo.humanos}), processando")
+    else:
+        print(f"    ❌ {match_id} → não casual/sem bots (matchType={resumo.match_type}, humanos={resumo.humanos}), ignorando")
+
+def aplicar_penalidade(cur, player_name, p_stats):
+    kills = p_stats.kills
+    dano = p_stats.damageDealt
+    score_penalidade = (kills * 10) + (dano * 0.1)
+    win_place = p_stats.winPlace
+
+    cur.execute("""
+        UPDATE ranking_bot SET
+            partidas = partidas + 1,
+            vitorias = vitorias + %s,
+            kills = kills - %s,
+            score = score - %s,
+            dano_medio = dano_medio + %s,
+            assists = assists + %s,
+            headshots = headshots + %s,
+            revives = revives + %s,
+            top10 = top10 + %s,
+            kill_dist_max = GREATEST(kill_dist_max, %s),
+            kr = ABS(CAST(kills - %s AS FLOAT) / NULLIF(partidas + 1, 0)),
+            atualizado_em = NOW()
+        WHERE nick = %s
+    """, (
+        1 if win_place == 1 else 0,
+        kills, score_penalidade, dano,
+        p_stats.assists,
+        p_stats.headshotKills,
+        p_stats.revives,
+        1 if win_place <= 10 else 0,
+        p_stats.longestKill,
+        kills,
+        player_name
+    ))
+
+def carregar_processadas(cur, match_ids, player_name=None):
+    """Retorna o conjunto de pares (match_id, player_name) já processados em uma consulta."""
+    if not match_ids:
+        return set()
+    if player_name is None:
+        cur.execute(
+            "SELECT match_id, player_name FROM matches_processadas WHERE match_id = ANY(%s)",
+            (list(match_ids),)
+        )
+    else:
+        cur.execute(
+            "SELECT match_id, player_name FROM matches_processadas WHERE match_id = ANY(%s) AND player_name = %s",
+            (list(match_ids), player_name)
+        )
+    return set(cur.fetchall())
+
+def gravar_processadas(cur, pares):
+    if pares:
+        execute_values(
+            cur,
+            "INSERT INTO matches_processadas (match_id, player_name) VALUES %s ON CONFLICT DO NOTHING",
+            pares
+        )
+
 def processar_player(conn, player_name, player_id):
     print(f"\n🔎 Processando: {player_name}")
     cur = conn.cursor()
-    player_data = get(f"https://api.pubg.com/shards/{SHARD}/players/{player_id}")
+    player_data = get(f"{BASE_URL}/players/{player_id}")
     if not player_data: return 0
 
     matches = player_data["data"]["relationships"]["matches"]["data"]
     print(f"📋 {player_name}: {len(matches)} partidas encontradas na API")
 
+    contagem = {"antiga": 0, "modo_errado": 0, "casual": 0, "nao_casual": 0}
     penalidades = 0
-    ignoradas_ja_processada = 0
-    ignoradas_modo_errado = 0
-    ignoradas_nao_casual = 0
-    ignoradas_antigas = 0
+    processadas = carregar_processadas(cur, [m["id"] for m in matches], player_name)
+    novas_processadas = []
 
     for m in matches:
         match_id = m["id"]
 
-        cur.execute("SELECT 1 FROM matches_processadas WHERE match_id = %s AND player_name = %s", (match_id, player_name))
-        if cur.fetchone():
+        if (match_id, player_name) in processadas:
             print(f"    ⏭️  {match_id} → já processada, ignorando")
-            ignoradas_ja_processada += 1
             continue
 
-        match_data = get(f"https://api.pubg.com/shards/{SHARD}/matches/{match_id}")
-        if not match_data:
+        resumo = obter_resumo(match_id, ids={player_id})
+        if not resumo:
             continue
 
-        attr = match_data["data"]["attributes"]
-        created_at = attr.get("createdAt")
+        categoria = classificar_partida(resumo)
+        imprimir_classificacao(match_id, categoria, resumo)
+        contagem[categoria] += 1
 
-        if created_at < INICIO_TEMPORADA_41:
-            print(f"    ⏩ {match_id} → partida antiga ({created_at}), ignorando")
-            cur.execute("INSERT INTO matches_processadas (match_id, player_name) VALUES (%s, %s) ON CONFLICT DO NOTHING", (match_id, player_name))
-            conn.commit()
-            ignoradas_antigas += 1
-            time.sleep(0.5)
-            continue
+        if categoria == "casual" and player_id in resumo.stats_por_id:
+            aplicar_penalidade(cur, player_name, resumo.stats_por_id[player_id])
+            penalidades += 1
 
-        if attr.get("gameMode") != "squad":
-            print(f"    ❌ {match_id} → modo errado ({attr.get('gameMode')}), ignorando")
-            ignoradas_modo_errado += 1
-            cur.execute("INSERT INTO matches_processadas (match_id, player_name) VALUES (%s, %s) ON CONFLICT DO NOTHING", (match_id, player_name))
-            conn.commit()
-            time.sleep(0.5)
+        novas_processadas.append((match_id, player_name))
+        time.sleep(0.5)
+
+    gravar_processadas(cur, novas_processadas)
+    conn.commit()
+
+    print(f"📊 Resumo {player_name}: {penalidades} penalidade(s) aplicada(s) | "
+          f"{contagem['antiga']} antigas ignoradas | "
+          f"{contagem['modo_errado']} modo errado | "
+          f"{contagem['nao_casual']} não casual")
+
+    return penalidades
+
+async def baixar_e_classificar(match_ids, concorrencia, ids=None):
+    """Baixa e classifica as partidas em paralelo, no máximo ``concorrencia`` por vez.
+
+    Só as stats dos ``ids`` do squad ficam no resumo de cada partida.
+    """
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async with ClientePubgAsync(max_conexoes=concorrencia) as cliente:
+        async def tarefa(match_id):
+            # Uma partida com erro fica sem processar (tenta de novo na próxima execução)
+            # sem derrubar as demais do gather
+            try:
+                async with semaforo:
+                    resumo = await obter_resumo_async(cliente, match_id, ids)
+                if not resumo:
+                    return None
+                return match_id, classificar_partida(resumo), resumo
+            except Exception as e:
+                print(f"⚠️ Erro na partida {match_id}: {e}")
+                return None
+
+        resultados = await asyncio.gather(*[tarefa(match_id) for match_id in match_ids])
+
+    return [r for r in resultados if r is not None]
+
+def _listas_por_id(players, grupos, respostas):
+    """match_ids de cada jogador a partir das respostas de /players?filter[playerIds]=.
+
+    Retorna também os nicks ausentes de uma resposta válida; lote que falhou
+    não conta como ausência.
+    """
+    por_id = {}
+    sem_resposta = set()
+    for grupo, resposta in zip(grupos, respostas):
+        resposta = indexar_por_id(resposta)
+        if resposta is None:
+            print(f"⚠️ Falha ao buscar {len(grupo)} jogador(es) pelo id — ficam para a próxima execução")
             continue
+        por_id.update(resposta)
+        sem_resposta.update(ausentes(grupo, resposta))
+    listas = {
+        player_name: [m["id"] for m in por_id[player_id]["relationships"]["matches"]["data"]]
+        for player_name, player_id in players.items() if player_id in por_id
+    }
+    return listas, [nick for nick, player_id in players.items() if player_id in sem_resposta]
+
+def listar_partidas(players):
+    # Uma chamada limitada a cada 10 jogadores, em vez de uma por jogador
+    grupos = list(lotes(players.values()))
+    return _listas_por_id(players, grupos, [get(url_por_ids(grupo)) for grupo in grupos])
+
+async def listar_partidas_async(cliente, players):
+    grupos = list(lotes(players.values()))
+    respostas = await asyncio.gather(*[
+        cliente.get_json(url_por_ids(grupo)) for grupo in grupos
+    ])
+    return _listas_por_id(players, grupos, respostas)
+
+def montar_pendentes(cur, players, listas, nao_encontrados):
+    """match_id -> [(player_name, player_id)] das partidas ainda não processadas.
+
+    Jogadores que não voltaram na busca pelo id ficam para ser resolvidos por nome.
+    """
+    marcar_para_resolver(cur, nao_encontrados)
+
+    todas = {match_id for match_ids in listas.values() for match_id in match_ids}
+    processadas = carregar_processadas(cur, todas)
+
+    pendentes = {}  # na ordem em que aparecem
+    for player_name, match_ids in listas.items():
+        novas = 0
+        for match_id in match_ids:
+            if (match_id, player_name) in processadas:
+                continue
+            pendentes.setdefault(match_id, []).append((player_name, players[player_name]))
+            novas += 1
+        print(f"📋 {player_name}: {len(match_ids)} partidas na API | {novas} pendente(s)")
+    return pendentes
+
+def aplicar_classificadas(cur, classificadas, pendentes, contagem, penalidades):
+    """Aplica as penalidades no ranking_bot; retorna os pares (match_id, player_name) avaliados."""
+    # Ordem determinística: data da partida, depois match_id
+    classificadas.sort(key=lambda c: (c[2].created_at or "", c[0]))
+    pares = []
+    for match_id, categoria, resumo in classificadas:
+        imprimir_classificacao(match_id, categoria, resumo)
+        contagem[categoria] += 1
+
+        for player_name, player_id in sorted(pendentes[match_id]):
+            if categoria == "casual" and player_id in resumo.stats_por_id:
+                aplicar_penalidade(cur, player_name, resumo.stats_por_id[player_id])
+                penalidades[player_name] = penalidades.get(player_name, 0) + 1
+                print(f"       🤖 penalidade aplicada a {player_name}")
+            pares.append((match_id, player_name))
+    return pares
+
+def imprimir_totais(penalidades, contagem):
+    for player_name, total in penalidades.items():
+        if total:
+            print(f"📊 Resumo {player_name}: {total} penalidade(s) aplicada(s)")
+    print(f"📊 Partidas: {contagem['casual']} casual | "
+          f"{contagem['antiga']} antigas ignoradas | "
+          f"{contagem['modo_errado']} modo errado | "
+          f"{contagem['nao_casual']} não casual")
+
+def processar_squad(conn, players, concorrencia=CONCORRENCIA_PADRAO):
+    """Baixa cada partida uma única vez e avalia todos os jogadores dela.
+
+    Jogando em squad, o mesmo match_id aparece na lista de 3–4 jogadores;
+    aqui a união das partidas pendentes é montada antes de qualquer download.
+    /matches não conta no rate limit, então os downloads rodam em paralelo
+    e só a aplicação no ranking_bot é sequencial.
+    """
+    cur = conn.cursor()
 
-        participants = [x for x in match_data["included"] if x["type"] == "participant"]
-        humanos = sum(1 for p in participants if p["attributes"]["stats"].get("playerId", "").startswith("account."))
-
-        if attr.get("matchType") == "casual" or humanos <= 12:
-            print(f"    ✅ {match_id} → casual/bots (matchType={attr.get('matchType')}, humanos={humanos}), processando")
-            p_stats = next((x["attributes"]["stats"] for x in participants if x["attributes"]["stats"].get("playerId") == player_id), None)
-
-            if p_stats:
-                kills = p_stats.get("kills", 0)
-                dano = p_stats.get("damageDealt", 0)
-                score_penalidade = (kills * 10) + (dano * 0.1)
-                win_place = p_stats.get("winPlace", 99)
-
-                cur.execute("""
-                    UPDATE ranking_bot SET
-                        partidas = partidas + 1,
-                        vitorias = vitorias + %s,
-                        kills = kills - %s,
-                        score = score - %s,
-                        dano_medio = dano_medio + %s,
-                        assists = assists + %s,
-                        headshots = headshots + %s,
-                        revives = revives + %s,
-                        top10 = top10 + %s,
-                        kill_dist_max = GREATEST(kill_dist_max, %s),
-                        kr = ABS(CAST(kills - %s AS FLOAT) / NULLIF(partidas + 1, 0)),
-                        atualizado_em = NOW()
-                    WHERE nick = %s
-                """, (
-                    1 if win_place == 1 else 0,
-                    kills, score_penalidade, dano,
-                    p_stats.get("assists", 0),
-                    p_stats.get("headshotKills", 0),
-                    p_stats.get("revives", 0),
-                    1 if win_place <= 10 else 0,
-                    p_stats.get("longestKill", 0),
-                    kills,
-                    player_name
-                ))
-                penalidades += 1
+    print("🔎 Montando lista de partidas pendentes do squad...")
+    with metricas().fase("lista_partidas", jogadores=len(players)):
+        listas, nao_encontrados = listar_partidas(players)
+    pendentes = montar_pendentes(cur, players, listas, nao_encontrados)
 
-        else:
-            print(f"    ❌ {match_id} → não casual/sem bots (matchType={attr.get('matchType')}, humanos={humanos}), ignorando")
-            ignoradas_nao_casual += 1
+    total_pares = sum(len(jogadores) for jogadores in pendentes.values())
+    print(f"\n📦 {len(pendentes)} partida(s) única(s) para {total_pares} par(es) partida/jogador")
 
-        cur.execute("INSERT INTO matches_processadas (match_id, player_name) VALUES (%s, %s) ON CONFLICT DO NOTHING", (match_id, player_name))
+    penalidades = {name: 0 for name in players}
+    contagem = {"antiga": 0, "modo_errado": 0, "casual": 0, "nao_casual": 0}
+
+    with metricas().fase("download_classificacao", partidas=len(pendentes), concorrencia=concorrencia):
+        classificadas = asyncio.run(baixar_e_classificar(list(pendentes), concorrencia, set(players.values())))
+
+    with metricas().fase("penalidades_banco", pares=total_pares):
+        novas_processadas = aplicar_classificadas(cur, classificadas, pendentes, contagem, penalidades)
+        # Penalidades e marcações entram juntas em um único commit por execução
+        gravar_processadas(cur, novas_processadas)
         conn.commit()
-        time.sleep(0.5)
 
-    print(f"📊 Resumo {player_name}: {penalidades} penalidade(s) aplicada(s) | "
-          f"{ignoradas_antigas} antigas ignoradas | "
-          f"{ignoradas_modo_errado} modo errado | "
-          f"{ignoradas_nao_casual} não casual")
+    imprimir_totais(penalidades, contagem)
+    return sum(penalidades.values())
 
-    return penalidades
+# ===============================
+# MODO WORKER (fila_jobs)
+# ===============================
+
+TIPO_JOB = "anti_casual"
+
+def reservar_processadas(cur, pares):
+    """Grava os pares e retorna só os que ainda não existiam.
+
+    Com vários workers, um job refeito depois de um lease vencido não
+    penaliza de novo quem outro worker já penalizou.
+    """
+    if not pares:
+        return set()
+    inseridos = execute_values(
+        cur,
+        "INSERT INTO matches_processadas (match_id, player_name) VALUES %s ON CONFLICT DO NOTHING RETURNING match_id, player_name",
+        pares, fetch=True
+    )
+    return set(inseridos)
+
+async def criar_lote(conn, cliente, lote, players):
+    """O primeiro worker monta as partidas pendentes do squad; um job por match_id."""
+    cur = conn.cursor()
+    if reservar_lote(cur, TIPO_JOB, lote):
+        print("🔎 Montando lista de partidas pendentes do squad...")
+        listas, nao_encontrados = await listar_partidas_async(cliente, players)
+        pendentes = montar_pendentes(cur, players, listas, nao_encontrados)
+        enfileirar(cur, TIPO_JOB, lote, [
+            (match_id, {"jogadores": jogadores}) for match_id, jogadores in pendentes.items()
+        ])
+        print(f"📥 Lote {lote}: {len(pendentes)} partida(s) na fila")
+    conn.commit()
+    cur.close()
+
+async def trabalhar(conn, lote, players, concorrencia=CONCORRENCIA_PADRAO):
+    """Reivindica partidas do lote e aplica as penalidades até a fila esvaziar."""
+    worker = nome_worker()
+    cur = conn.cursor()
+    penalidades = {}
+    contagem = {"antiga": 0, "modo_errado": 0, "casual": 0, "nao_casual": 0}
+
+    conn_bucket = psycopg2.connect(DATABASE_URL)
+    bucket = TokenBucketBanco(conn_bucket)
+    try:
+        # Só a listagem do squad é limitada; o orçamento é dividido entre os workers
+        async with ClientePubgAsync(bucket=bucket) as cliente:
+            with metricas().fase("lote"):
+                await criar_lote(conn, cliente, lote, players)
+    finally:
+        bucket.fechar()
+        conn_bucket.close()
+
+    while True:
+        jobs = reivindicar(conn, TIPO_JOB, lote, worker, concorrencia * 4)
+        if not jobs:
+            if await aguardar_leases(conn, TIPO_JOB, lote):
+                continue
+            break
+        ids = [job_id for job_id, _, _ in jobs]
+        pendentes = {match_id: [tuple(j) for j in dados["jogadores"]] for _, match_id, dados in jobs}
+        ids_squad = {player_id for jogadores in pendentes.values() for _, player_id in jogadores}
+        try:
+            with metricas().fase("job", partidas=len(pendentes)):
+                classificadas = await baixar_e_classificar(list(pendentes), concorrencia, ids_squad)
+                baixadas = {match_id for match_id, _, _ in classificadas}
+                novas = reservar_processadas(cur, [
+                    (match_id, player_name) for match_id in baixadas for player_name, _ in pendentes[match_id]
+                ])
+                pendentes = {
+                    match_id: [j for j in jogadores if (match_id, j[0]) in novas]
+                    for match_id, jogadores in pendentes.items()
+                }
+                aplicar_classificadas(cur, classificadas, pendentes, contagem, penalidades)
+                concluir(cur, [job_id for job_id, match_id, _ in jobs if match_id in baixadas])
+                conn.commit()
+            # Partidas que não baixaram voltam para a fila
+            falhas = [job_id for job_id, match_id, _ in jobs if match_id not in baixadas]
+            if falhas:
+                devolver(conn, falhas, "download da partida falhou")
+        except Exception as e:
+            conn.rollback()
+            print(f"💥 Erro no grupo de {len(ids)} partida(s): {e}")
+            devolver(conn, ids, str(e))
+
+    cur.close()
+    imprimir_totais(penalidades, contagem)
+    return sum(penalidades.values())
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Anti-Casual: penaliza partidas casuais/com bots")
+    parser.add_argument(
+        "--modo", choices=["squad", "jogador", "worker"], default="squad",
+        help="squad: baixa cada partida uma vez para todo o squad; jogador: um jogador por vez; "
+             "worker: divide as partidas com outros workers pela fila no banco (fila_jobs)"
+    )
+    parser.add_argument(
+        "--concorrencia", type=int, default=CONCORRENCIA_PADRAO,
+        help="downloads de partidas simultâneos nos modos squad e worker"
+    )
+    parser.add_argument(
+        "--lote", default=lote_padrao(),
+        help="modo worker: identificador da execução compartilhado pelos workers (padrão: GITHUB_RUN_ID)"
+    )
+    args = parser.parse_args()
+
     if not DATABASE_URL:
         print("❌ DATABASE_URL não configurado.")
     else:
+        m = iniciar_metricas("anti_casual")
         conn = psycopg2.connect(DATABASE_URL)
 
+        with conn.cursor() as c, m.fase("cadastro"):
+            travar_esquema(c)
+            garantir_registro(c)
+            if args.modo == "worker":
+                garantir_fila(c)
+            conn.commit()
+            registro = resolver_pendentes(c, carregar_registro(c), get)
+        conn.commit()
+        jogadores = {nick: account_id for nick, account_id in registro.items() if account_id}
+
         #print("🧹 Limpando histórico de partidas para reprocessar corretamente...")
         #with conn.cursor() as c:
         #    c.execute("DELETE FROM matches_processadas;")
@@ -212,12 +462,32 @@ if __name__ == "__main__":
         #    """)
         #conn.commit()
 
-        total_geral = 0
-        for name, pid in PLAYERS.items():
-            total_geral += processar_player(conn, name, pid)
+        fechar = True
+        if args.modo == "squad":
+            total_geral = processar_squad(conn, jogadores, max(1, args.concorrencia))
+        elif args.modo == "worker":
+            total_geral = asyncio.run(trabalhar(conn, args.lote, jogadores, max(1, args.concorrencia)))
+            # Snapshot e ranking só uma vez, pelo worker que fecha o lote
+            with conn.cursor() as c:
+                fechar = finalizar_lote(c, TIPO_JOB, args.lote)
+                if fechar:
+                    print(f"🏁 Lote {args.lote} concluído ({resumo_lote(contar_jobs(c, TIPO_JOB, args.lote))})")
+            conn.commit()
+        else:
+            total_geral = 0
+            for name, pid in jogadores.items():
+                with metricas().fase("jogador", jogador=name):
+                    total_geral += processar_player(conn, name, pid)
+
+        if fechar:
+            # Salva snapshot semanal do ranking_bot
+            with m.fase("snapshot_semanal"):
+                salvar_snapshot_bot_semanal(conn)
 
-        # Salva snapshot semanal do ranking_bot
-        salvar_snapshot_bot_semanal(conn)
+            # Ranking final (com as novas deduções) recalculado no banco
+            with m.fase("ranking_materializado"):
+                atualizar_ranking_materializado(conn)
 
         conn.close()
         print(f"\n✅ Concluído! Total de penalidades aplicadas: {total_geral}")
+        m.gravar(DATABASE_URL, modo=args.modo, jogadores=len(jogadores), penalidades=total_geral)
@@ -0,0 +1,268 @@
+# benchmark_dashboard.py
+# Benchmark offline do pipeline de dados do dashboard (sem banco e sem rede).
+# Gera um elenco sintético com o formato de v_ranking_squad_completo,
+# ranking_bot, ranking_semanal e ranking_bot_semanal e mede cada etapa
+# do pubgappscore.py separadamente.
+#
+#   python benchmark_dashboard.py --jogadores 19 1000 100000 --semanas 52
+#   python benchmark_dashboard.py --salvar-base base.json
+#   python benchmark_dashboard.py --comparar base.json --tolerancia 0.25
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+import pandas as pd
+from ranking_calculos import (
+    COLUNAS_SEMANAIS, EMOJIS_ZONA, PainelSemanal, deduzir_bots, estilizar_ranking,
+    limpar_nicks, normalizar_numericos, processar_ranking_completo
+)
+from ranking_formulas import FORMULAS
+from ranking_pontuacao import calcular_scores
+
+# Mesmo corte do dashboard
+COLS_CALC = [
+    "partidas", "vitorias", "kills",
+    "assists", "headshots", "revives", "dano_medio", "top10"
+]
+
+# Referência fixa de "agora" para o decaimento ser reprodutível
+AGORA = pd.Timestamp("2026-10-05", tz="UTC")
+
+# Acima disso o Styler (to_html) leva minutos e não representa o uso real
+STYLER_MAX_LINHAS = 5000
+
+
+# ===============================
+# GERADOR DO ELENCO SINTÉTICO
+# ===============================
+
+def _stats(rng, partidas):
+    """Stats coerentes entre si a partir do número de partidas."""
+    kr = rng.gamma(2.0, 0.6, len(partidas))
+    kills = np.round(partidas * kr).astype(int)
+    headshots = rng.binomial(kills, 0.25)
+    return {
+        "partidas": partidas,
+        "kr": np.round(kills / np.maximum(partidas, 1), 2),
+        "vitorias": rng.binomial(partidas, 0.06),
+        "kills": kills,
+        "assists": rng.binomial(np.maximum(partidas * 2, 0), 0.25),
+        "headshots": headshots,
+        "revives": rng.binomial(partidas, 0.3),
+        "kill_dist_max": np.round(np.where(kills > 0, rng.uniform(20, 650, len(partidas)), 0), 2),
+        "dano_medio": np.where(partidas > 0, np.round(kr * 110 + rng.normal(60, 20, len(partidas))), 0)
+        .clip(0).astype(int),
+        "top10": rng.binomial(partidas, 0.35),
+    }
+
+
+def gerar_elenco(jogadores, semanas=52, semente=41, fracao_bots=0.3):
+    """Retorna os quatro DataFrames como o dashboard os recebe do banco."""
+    rng = np.random.default_rng(semente)
+    nicks = np.array([f"Jogador{i:06d}" for i in range(jogadores)], dtype=object)
+    # Alguns nicks chegam do banco ainda com o emoji de zona
+    com_emoji = rng.random(jogadores) < 0.1
+    nicks_banco = np.where(
+        com_emoji, rng.choice(EMOJIS_ZONA, jogadores).astype(object) + " " + nicks, nicks
+    )
+
+    # Semanal: acumulado da temporada a cada segunda, a partir da semana de entrada
+    inicio = AGORA.normalize() - pd.Timedelta(weeks=semanas - 1)
+    datas = pd.date_range(inicio, periods=semanas, freq="7D")
+    entrada = rng.integers(0, max(semanas // 2, 1), jogadores)
+    por_semana = rng.poisson(rng.gamma(2.0, 6.0, jogadores)[:, None], (jogadores, semanas))
+    por_semana[np.arange(semanas)[None, :] < entrada[:, None]] = 0
+    acumulado = por_semana.cumsum(axis=1)
+
+    linhas_i, linhas_j = np.nonzero(np.arange(semanas)[None, :] >= entrada[:, None])
+    semanal = pd.DataFrame(_stats(rng, acumulado[linhas_i, linhas_j]))
+    semanal.insert(0, "nick", nicks[linhas_i])
+    semanal.insert(1, "semana", datas[linhas_j])
+    # Acumulados não podem diminuir de uma semana para outra
+    for col in ["vitorias", "kills", "assists", "headshots", "revives", "top10"]:
+        semanal[col] = semanal.groupby("nick")[col].cummax()
+    semanal = semanal[["nick", "semana"] + COLUNAS_SEMANAIS]
+
+    # Temporada: a última semana de cada jogador
+    ultimo = semanal.drop_duplicates("nick", keep="last").reset_index(drop=True)
+    dias_inativo = rng.exponential(6, jogadores).astype(int)
+    ranking = ultimo.drop(columns="semana").assign(nick=nicks_banco)
+    ranking["updated_at"] = (AGORA - pd.to_timedelta(dias_inativo, unit="D")).strftime("%Y-%m-%dT%H:%M:%SZ")
+    ranking["atualizado_em"] = AGORA - pd.to_timedelta(dias_inativo % 3, unit="D")
+    ranking["ultima_atualizacao"] = ranking["atualizado_em"].max()
+
+    # Anti-casual: uma fração dos jogadores com parte das partidas em modo casual
+    com_bot = rng.random(jogadores) < fracao_bots
+    fracao = rng.uniform(0.05, 0.4, jogadores)[com_bot]
+    base = ultimo[com_bot]
+    bots = pd.DataFrame({"nick": nicks_banco[com_bot]})
+    for col in COLS_CALC + ["kr", "kill_dist_max"]:
+        bots[col] = np.floor(base[col].to_numpy() * fracao).astype(base[col].dtype)
+    bots["score"] = np.round(bots["kills"] * 0.5 + bots["partidas"] * 0.2, 2)
+
+    bot_semanal = semanal[semanal["nick"].isin(set(nicks[com_bot]))]
+    bot_semanal = bot_semanal[["nick", "semana", "partidas", "vitorias", "kills",
+                               "assists", "headshots", "revives", "top10"]].copy()
+    fracao_por_nick = pd.Series(fracao, index=nicks[com_bot])
+    fator = fracao_por_nick.reindex(bot_semanal["nick"]).to_numpy()
+    for col in bot_semanal.columns[2:]:
+        bot_semanal[col] = np.floor(bot_semanal[col].to_numpy() * fator).astype(int)
+
+    return {
+        "ranking": ranking,
+        "bots": bots,
+        "semanal": semanal.sort_values("semana", ascending=False).reset_index(drop=True),
+        "bot_semanal": bot_semanal.sort_values("semana", ascending=False).reset_index(drop=True),
+    }
+
+
+# ===============================
+# ETAPAS (mesma ordem do pubgappscore.py)
+# ===============================
+
+def etapas(dados):
+    """Lista de (nome, função) encadeadas; cada função recebe e devolve o estado."""
+
+    def coercao(e):
+        e["ranking"] = normalizar_numericos(e["ranking"], COLS_CALC)
+        e["bots"] = normalizar_numericos(e["bots"], COLS_CALC)
+        return e
+
+    def deducao(e):
+        e["ranking"] = deduzir_bots(e["ranking"], e["bots"])
+        return e
+
+    def nicks(e):
+        e["ranking"]["nick_limpo"] = limpar_nicks(e["ranking"]["nick"])
+        e["bots"]["nick_limpo"] = limpar_nicks(e["bots"]["nick"])
+        for col in COLS_CALC:
+            e["ranking"][col] = e["ranking"][col].astype(int)
+        return e
+
+    def notas(e):
+        df_valid = e["ranking"][e["ranking"]["partidas"] > 0].copy()
+        scores = calcular_scores(df_valid, agora=AGORA)
+        df_valid[scores.columns] = scores
+        e["valid"] = df_valid
+        return e
+
+    def ranking(e):
+        e["finais"] = {nome: processar_ranking_completo(e["valid"], nome) for nome in FORMULAS}
+        bots = e["bots"][e["bots"]["partidas"] > 0]
+        e["finais"]["score"] = processar_ranking_completo(bots, "score")
+        return e
+
+    def painel(e):
+        e["painel"] = PainelSemanal.montar(e["semanal"], e["bot_semanal"])
+        return e
+
+    def semana(e):
+        ultima = e["painel"].semanas[-1]
+        df_graf = pd.DataFrame({"nick": e["ranking"]["nick"].unique()})
+        e["graf"] = df_graf.merge(e["painel"].semana(ultima), on="nick", how="left").fillna(0)
+        return e
+
+    def styler(e):
+        for col_score, df in e["finais"].items():
+            estilizar_ranking(df, col_score).to_html()
+        return e
+
+    lista = [
+        ("coercao", coercao), ("deducao_bots", deducao), ("nicks", nicks),
+        ("notas", notas), ("ranking_zonas", ranking), ("painel_semanal", painel),
+        ("semana", semana),
+    ]
+    if len(dados["ranking"]) <= STYLER_MAX_LINHAS:
+        lista.append(("styler", styler))
+    return lista
+
+
+def medir(dados, repeticoes):
+    """Mediana de cada etapa em segundos, recomeçando de uma cópia dos dados."""
+    tempos = {}
+    for _ in range(repeticoes):
+        estado = {nome: df.copy() for nome, df in dados.items()}
+        for nome, funcao in etapas(dados):
+            inicio = time.perf_counter()
+            estado = funcao(estado)
+            tempos.setdefault(nome, []).append(time.perf_counter() - inicio)
+    return {nome: float(np.median(valores)) for nome, valores in tempos.items()}
+
+
+def comparar(resultados, base, tolerancia, piso):
+    """Lista de regressões: mais lento que a base além da tolerância e do piso absoluto."""
+    regressoes = []
+    for tamanho, etapas_atuais in resultados.items():
+        for nome, atual in etapas_atuais.items():
+            anterior = base.get(tamanho, {}).get(nome)
+            if anterior is None:
+                continue
+            if atual > anterior * (1 + tolerancia) and atual - anterior > piso:
+                regressoes.append((tamanho, nome, anterior, atual))
+    return regressoes
+
+
+def imprimir(resultados, base=None):
+    for tamanho, tempos in resultados.items():
+        print(f"\n👥 {tamanho} jogadores")
+        for nome, segundos in tempos.items():
+            linha = f"   {nome:<15} {segundos * 1000:10.2f} ms"
+            anterior = (base or {}).get(tamanho, {}).get(nome)
+            if anterior:
+                linha += f"   (base {anterior * 1000:.2f} ms, {segundos / anterior:.2f}x)"
+            print(linha)
+        print(f"   {'total':<15} {sum(tempos.values()) * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark offline do pipeline do dashboard")
+    parser.add_argument("--jogadores", type=int, nargs="+", default=[19, 1000, 10000])
+    parser.add_argument("--semanas", type=int, default=52)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--semente", type=int, default=41)
+    parser.add_argument("--salvar-base", metavar="ARQUIVO", help="grava os tempos como nova base")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="compara com uma base gravada")
+    parser.add_argument("--tolerancia", type=float, default=0.25,
+                        help="fração acima da base que conta como regressão (padrão 0.25)")
+    parser.add_argument("--piso-ms", type=float, default=2.0,
+                        help="diferença absoluta mínima para contar como regressão")
+    args = parser.parse_args()
+
+    resultados = {}
+    for jogadores in args.jogadores:
+        inicio = time.perf_counter()
+        dados = gerar_elenco(jogadores, args.semanas, args.semente)
+        print(
+            f"🧪 Elenco sintético: {jogadores} jogadores, {len(dados['semanal'])} linhas semanais "
+            f"({time.perf_counter() - inicio:.1f}s para gerar)"
+        )
+        resultados[str(jogadores)] = medir(dados, args.repeticoes)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            base = json.load(f)["resultados"]
+
+    imprimir(resultados, base)
+
+    if args.salvar_base:
+        with open(args.salvar_base, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "pandas": pd.__version__,
+                "numpy": np.__version__,
+                "semanas": args.semanas,
+                "resultados": resultados,
+            }, f, indent=2)
+        print(f"\n💾 Base gravada em {args.salvar_base}")
+
+    if base is not None:
+        regressoes = comparar(resultados, base, args.tolerancia, args.piso_ms / 1000)
+        if regressoes:
+            print("\n❌ Regressões:")
+            for tamanho, nome, anterior, atual in regressoes:
+                print(f"   {tamanho} jogadores / {nome}: {anterior * 1000:.2f} ms → {atual * 1000:.2f} ms")
+            sys.exit(1)
+        print("\n✅ Nenhuma regressão em relação à base.")
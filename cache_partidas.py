@@ -0,0 +1,128 @@
+# cache_partidas.py
+import os
+import re
+import gzip
+from metricas import metricas
+from pubg_api import BASE_URL, avisar_status, cliente_padrao
+from resumo_partidas import ERROS_PAYLOAD, resumir_arquivo, resumir_bytes
+
+# Uma partida da PUBG nunca muda depois de criada: o payload de /matches/{id}
+# é baixado uma única vez e guardado comprimido em disco.
+CACHE_DIR = os.environ.get("PUBG_MATCH_CACHE_DIR", ".cache/partidas")
+LIMITE_MB = int(os.environ.get("PUBG_MATCH_CACHE_MB", 512))
+
+_MATCH_ID = re.compile(r"^[0-9a-zA-Z-]+$")
+_tamanho_total = None
+
+
+def _caminho(match_id):
+    if not _MATCH_ID.match(match_id):
+        raise ValueError(f"match_id inválido: {match_id!r}")
+    return os.path.join(CACHE_DIR, f"{match_id}.json.gz")
+
+
+def ler_resumo(match_id, ids=None):
+    """Resumo da partida lido do cache, ou None se não estiver lá."""
+    caminho = _caminho(match_id)
+    try:
+        tamanho = os.path.getsize(caminho)
+        resumo = resumir_arquivo(lambda: gzip.open(caminho, "rb"), ids, tamanho)
+    except (OSError, EOFError) + ERROS_PAYLOAD:
+        metricas().contar("cache_partidas_ausentes")
+        return None
+    metricas().contar("cache_partidas_acertos")
+    # Marca como usada recentemente para a política LRU
+    try:
+        os.utime(caminho, None)
+    except OSError:
+        pass
+    return resumo
+
+
+def gravar(match_id, bruto):
+    global _tamanho_total
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    caminho = _caminho(match_id)
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with gzip.open(temporario, "wb", compresslevel=6) as f:
+        f.write(bruto)
+    os.replace(temporario, caminho)
+
+    if _tamanho_total is None:
+        _tamanho_total = sum(tamanho for _, tamanho, _ in _listar())
+    else:
+        _tamanho_total += os.path.getsize(caminho)
+
+    if _tamanho_total > LIMITE_MB * 1024 * 1024:
+        _aplicar_limite()
+
+
+def _listar():
+    try:
+        nomes = os.listdir(CACHE_DIR)
+    except FileNotFoundError:
+        return []
+    arquivos = []
+    for nome in nomes:
+        if not nome.endswith(".json.gz"):
+            continue
+        caminho = os.path.join(CACHE_DIR, nome)
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            continue
+        arquivos.append((caminho, st.st_size, st.st_mtime))
+    return arquivos
+
+
+def _aplicar_limite():
+    """Remove as partidas usadas há mais tempo até ficar em 90% do limite."""
+    global _tamanho_total
+    arquivos = sorted(_listar(), key=lambda a: a[2])
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    alvo = LIMITE_MB * 1024 * 1024 * 0.9
+    removidas = 0
+    for caminho, tamanho, _ in arquivos:
+        if total <= alvo:
+            break
+        try:
+            os.remove(caminho)
+        except OSError:
+            continue
+        total -= tamanho
+        removidas += 1
+    _tamanho_total = total
+    if removidas:
+        print(f"🧹 Cache de partidas: {removidas} partida(s) antigas removidas")
+
+
+def obter_resumo(match_id, ids=None):
+    """Resumo da partida (ver resumo_partidas) do cache, ou baixado da API uma única vez.
+
+    ``ids``: player ids cujas stats interessam; os demais participantes só
+    entram na contagem de humanos.
+    """
+    resumo = ler_resumo(match_id, ids)
+    if resumo is not None:
+        return resumo
+    url = f"{BASE_URL}/matches/{match_id}"
+    res = cliente_padrao().requisitar(url)
+    if res is None:
+        return None
+    if res.status_code != 200:
+        avisar_status(res.status_code, url)
+        return None
+    gravar(match_id, res.content)
+    return resumir_bytes(res.content, ids)
+
+
+async def obter_resumo_async(cliente, match_id, ids=None):
+    """Versão para o ClientePubgAsync dos importadores."""
+    resumo = ler_resumo(match_id, ids)
+    if resumo is not None:
+        return resumo
+    bruto = await cliente.get_bytes(f"{BASE_URL}/matches/{match_id}")
+    if bruto is None:
+        return None
+    gravar(match_id, bruto)
+    return resumir_bytes(bruto, ids)
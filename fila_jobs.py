@@ -0,0 +1,386 @@
+# fila_jobs.py
+# Fila de jobs no Postgres para dividir uma sincronização entre vários
+# workers (runners do Actions ou processos). Cada execução é um "lote"; o
+# primeiro worker a chegar cria o lote com todos os jobs e os demais só
+# reivindicam. Um job reivindicado fica com um lease: se o worker morrer,
+# o lease vence e outro worker pega o job de novo.
+#
+# O orçamento de requisições da chave da PUBG é um só para todos os workers,
+# então o token bucket também mora no banco (tabela limite_api).
+import os
+import time
+import socket
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2.extras import Json, execute_values
+from pubg_api import LIMITE_POR_MINUTO
+
+# Tempo que um job fica com o worker antes de poder ser pego por outro
+LEASE_S = int(os.environ.get("PUBG_FILA_LEASE_S", 600))
+MAX_TENTATIVAS = 3
+# Sem job livre mas com jobs de outros workers em andamento: intervalo máximo entre consultas
+ESPERA_MAX_S = 30
+# Lotes mais antigos que isso são apagados quando um novo é criado
+RETENCAO_DIAS = 7
+
+
+def lote_padrao():
+    """Identificador da execução: matrix jobs do mesmo workflow compartilham o GITHUB_RUN_ID.
+
+    O "Re-run jobs" do Actions mantém o GITHUB_RUN_ID e só incrementa o
+    GITHUB_RUN_ATTEMPT, então a tentativa também entra no identificador.
+    """
+    if os.environ.get("PUBG_LOTE"):
+        return os.environ["PUBG_LOTE"]
+    if os.environ.get("GITHUB_RUN_ID"):
+        return f"{os.environ['GITHUB_RUN_ID']}-{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}"
+    return time.strftime("%Y%m%d%H", time.gmtime())
+
+
+def nome_worker():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def garantir_fila(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS fila_lotes (
+        tipo TEXT NOT NULL,
+        lote TEXT NOT NULL,
+        dados JSONB NOT NULL DEFAULT '{}',
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        finalizado_em TIMESTAMPTZ,
+        PRIMARY KEY (tipo, lote)
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS fila_jobs (
+        id BIGSERIAL PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        lote TEXT NOT NULL,
+        chave TEXT NOT NULL,
+        dados JSONB NOT NULL DEFAULT '{}',
+        estado TEXT NOT NULL DEFAULT 'pendente',
+        tentativas INT NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_ate TIMESTAMPTZ,
+        erro TEXT,
+        concluido_em TIMESTAMPTZ,
+        UNIQUE (tipo, lote, chave)
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS fila_jobs_pendentes
+    ON fila_jobs (tipo, lote, id) WHERE estado = 'pendente'
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS limite_api (
+        chave TEXT PRIMARY KEY,
+        tokens DOUBLE PRECISION NOT NULL,
+        capacidade INT NOT NULL,
+        janela_s DOUBLE PRECISION NOT NULL,
+        bloqueado_ate TIMESTAMPTZ,
+        atualizado_em TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+    )
+    """)
+
+
+def reservar_lote(cursor, tipo, lote, dados=None):
+    """Tenta criar o lote; True se este worker é o criador.
+
+    A linha fica travada até o commit: quem chegar depois espera no INSERT e,
+    quando o criador commitar, já encontra os jobs. Se o criador cair antes,
+    o rollback libera a vez para o próximo.
+    """
+    cursor.execute("""
+    INSERT INTO fila_lotes (tipo, lote, dados) VALUES (%s, %s, %s)
+    ON CONFLICT DO NOTHING
+    RETURNING lote
+    """, (tipo, lote, Json(dados or {})))
+    criado = cursor.fetchone() is not None
+    if not criado:
+        # Reexecução com o mesmo identificador: os jobs antigos já estão feitos/falhos
+        cursor.execute(
+            "SELECT finalizado_em FROM fila_lotes WHERE tipo = %s AND lote = %s",
+            (tipo, lote)
+        )
+        linha = cursor.fetchone()
+        if linha and linha[0] is not None:
+            print(f"⚠️ Lote {lote} de {tipo} já foi finalizado em {linha[0]:%Y-%m-%d %H:%M} — "
+                  f"nada a fazer. Para rodar de novo, use outro --lote (ou PUBG_LOTE).")
+    else:
+        cursor.execute("""
+        DELETE FROM fila_jobs j USING fila_lotes l
+        WHERE j.tipo = l.tipo AND j.lote = l.lote
+          AND l.criado_em < NOW() - make_interval(days => %s)
+        """, (RETENCAO_DIAS,))
+        cursor.execute(
+            "DELETE FROM fila_lotes WHERE criado_em < NOW() - make_interval(days => %s)",
+            (RETENCAO_DIAS,)
+        )
+    return criado
+
+
+def enfileirar(cursor, tipo, lote, jobs):
+    """jobs: iterável de (chave, dados). Chaves repetidas no lote são ignoradas."""
+    execute_values(cursor, """
+    INSERT INTO fila_jobs (tipo, lote, chave, dados) VALUES %s
+    ON CONFLICT (tipo, lote, chave) DO NOTHING
+    """, [(tipo, lote, chave, Json(dados or {})) for chave, dados in jobs])
+
+
+def ler_lote(cursor, tipo, lote):
+    cursor.execute("SELECT dados FROM fila_lotes WHERE tipo = %s AND lote = %s", (tipo, lote))
+    linha = cursor.fetchone()
+    return linha[0] if linha else None
+
+
+def reivindicar(conn, tipo, lote, worker, quantidade, lease_s=LEASE_S):
+    """Pega até ``quantidade`` jobs livres do lote, com lease. Commita na hora.
+
+    Retorna [(id, chave, dados)]. Jobs cujo lease venceu voltam a ser livres;
+    os que já esgotaram as tentativas são marcados como falhos.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        UPDATE fila_jobs SET estado = 'falhou', erro = COALESCE(erro, 'lease vencido'), lease_ate = NULL
+        WHERE tipo = %s AND lote = %s AND estado = 'pendente'
+          AND lease_ate < NOW() AND tentativas >= %s
+        """, (tipo, lote, MAX_TENTATIVAS))
+        cursor.execute("""
+        UPDATE fila_jobs SET
+            worker = %s,
+            lease_ate = NOW() + make_interval(secs => %s),
+            tentativas = tentativas + 1
+        WHERE id IN (
+            SELECT id FROM fila_jobs
+            WHERE tipo = %s AND lote = %s AND estado = 'pendente'
+              AND (lease_ate IS NULL OR lease_ate < NOW())
+            ORDER BY id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, chave, dados
+        """, (worker, lease_s, tipo, lote, quantidade))
+        jobs = sorted(cursor.fetchall())
+    conn.commit()
+    return jobs
+
+
+async def aguardar_leases(conn, tipo, lote, espera_max=ESPERA_MAX_S):
+    """Chamada quando ``reivindicar`` volta vazio. False se não resta job pendente.
+
+    Se ainda há jobs pendentes com outros workers, espera até o próximo lease
+    vencer (no máximo ``espera_max``) e retorna True para reivindicar de novo:
+    assim o job de um worker que caiu é refeito e o lote chega a ser fechado.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        SELECT COUNT(*), EXTRACT(EPOCH FROM MIN(lease_ate) - NOW())
+        FROM fila_jobs
+        WHERE tipo = %s AND lote = %s AND estado = 'pendente'
+        """, (tipo, lote))
+        pendentes, segundos = cursor.fetchone()
+    conn.commit()
+    if not pendentes:
+        return False
+    espera = min(max(float(segundos or 0), 1.0), espera_max)
+    print(f"⏳ {pendentes} job(s) com outros workers — nova tentativa em {espera:.0f}s")
+    await asyncio.sleep(espera)
+    return True
+
+
+def concluir(cursor, ids):
+    """Marca os jobs como feitos; chamar na mesma transação que grava o resultado."""
+    cursor.execute("""
+    UPDATE fila_jobs SET estado = 'feito', concluido_em = NOW(), lease_ate = NULL, erro = NULL
+    WHERE id = ANY(%s)
+    """, (list(ids),))
+
+
+def devolver(conn, ids, erro):
+    """Depois de um rollback: libera os jobs para outra tentativa (ou falha de vez)."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+        UPDATE fila_jobs SET
+            lease_ate = NULL,
+            erro = %s,
+            estado = CASE WHEN tentativas >= %s THEN 'falhou' ELSE 'pendente' END
+        WHERE id = ANY(%s) AND estado = 'pendente'
+        """, (erro[:500], MAX_TENTATIVAS, list(ids)))
+    conn.commit()
+
+
+def contar_jobs(cursor, tipo, lote):
+    cursor.execute("""
+    SELECT estado, COUNT(*) FROM fila_jobs
+    WHERE tipo = %s AND lote = %s
+    GROUP BY estado
+    """, (tipo, lote))
+    return dict(cursor.fetchall())
+
+
+def resumo_lote(contagem):
+    return ", ".join(f"{estado}: {total}" for estado, total in sorted(contagem.items())) or "vazio"
+
+
+def finalizar_lote(cursor, tipo, lote):
+    """True para um único worker, quando não resta job pendente no lote.
+
+    Quem recebe True faz as etapas de fechamento (snapshot, ranking) e commita.
+    """
+    cursor.execute("""
+    UPDATE fila_lotes SET finalizado_em = NOW()
+    WHERE tipo = %s AND lote = %s AND finalizado_em IS NULL
+      AND NOT EXISTS (
+          SELECT 1 FROM fila_jobs
+          WHERE tipo = %s AND lote = %s AND estado = 'pendente'
+      )
+    RETURNING lote
+    """, (tipo, lote, tipo, lote))
+    return cursor.fetchone() is not None
+
+
+class TokenBucketBanco:
+    """Token bucket na tabela limite_api, dividido entre todos os workers.
+
+    Mesma interface do TokenBucket de pubg_api (adquirir/atualizar/bloquear),
+    então pode ser passado ao ClientePubgAsync. Usa uma conexão só sua, que
+    commita a cada operação, para não segurar locks da transação de trabalho.
+
+    As idas ao banco rodam numa thread própria (uma só, então ficam em ordem
+    e a conexão nunca é usada por duas ao mesmo tempo): o event loop segue
+    com os downloads enquanto o Postgres responde. Chamar ``fechar`` no fim.
+    """
+
+    # Intervalo máximo entre consultas enquanto espera: outro worker pode
+    # ter recebido headers novos da API nesse meio tempo
+    ESPERA_MAX_S = 5.0
+
+    def __init__(self, conn, chave="pubg", capacidade=LIMITE_POR_MINUTO, janela=60.0):
+        self.conn = conn
+        self.chave = chave
+        self._lock = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="limite_api")
+        with conn.cursor() as cursor:
+            cursor.execute("""
+            INSERT INTO limite_api (chave, tokens, capacidade, janela_s) VALUES (%s, %s, %s, %s)
+            ON CONFLICT DO NOTHING
+            """, (chave, float(capacidade), capacidade, janela))
+        conn.commit()
+
+    @property
+    def trava(self):
+        # Criada dentro do event loop (asyncio.Lock no 3.9 se prende ao loop da criação)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def fechar(self):
+        """Espera as gravações pendentes (atualizar/bloquear) antes de fechar a conexão."""
+        self._executor.shutdown(wait=True)
+
+    def _em_segundo_plano(self, funcao, *args):
+        # atualizar/bloquear são chamados sem await pelo cliente: só enfileiram
+        def executar():
+            try:
+                funcao(*args)
+            except Exception as e:
+                self.conn.rollback()
+                print(f"⚠️ Falha ao gravar o limite da API compartilhado: {e}")
+        self._executor.submit(executar)
+
+    def _consumir(self):
+        """Tenta tirar um token; retorna 0 se conseguiu ou os segundos até tentar de novo."""
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+            SELECT tokens, capacidade, janela_s,
+                   EXTRACT(EPOCH FROM clock_timestamp() - atualizado_em)::float8,
+                   EXTRACT(EPOCH FROM bloqueado_ate - clock_timestamp())::float8
+            FROM limite_api WHERE chave = %s
+            FOR UPDATE
+            """, (self.chave,))
+            tokens, capacidade, janela, decorrido, bloqueio = cursor.fetchone()
+
+            if bloqueio is not None and bloqueio > 0:
+                self.conn.rollback()
+                return bloqueio
+            if bloqueio is not None:
+                # A janela da API reiniciou
+                tokens = float(capacidade)
+            else:
+                tokens = min(capacidade, tokens + max(decorrido, 0) * capacidade / janela)
+
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) * janela / capacidade
+
+            cursor.execute("""
+            UPDATE limite_api SET tokens = %s, bloqueado_ate = NULL, atualizado_em = clock_timestamp()
+            WHERE chave = %s
+            """, (tokens, self.chave))
+        self.conn.commit()
+        return espera
+
+    async def adquirir(self):
+        async with self.trava:
+            avisado = False
+            while True:
+                espera = await asyncio.get_running_loop().run_in_executor(self._executor, self._consumir)
+                if espera <= 0:
+                    return
+                if espera > self.ESPERA_MAX_S and not avisado:
+                    print(f"⏳ Limite da API (compartilhado) esgotado. Aguardando ~{round(espera, 1)}s...")
+                    avisado = True
+                await asyncio.sleep(min(espera, self.ESPERA_MAX_S))
+
+    def atualizar(self, headers):
+        limite = headers.get("X-RateLimit-Limit")
+        restante = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+
+        capacidade = int(limite) if limite and limite.isdigit() and int(limite) > 0 else None
+        if restante is None or not restante.isdigit():
+            restante = None
+        reset = int(reset) if restante == "0" and reset and reset.isdigit() else None
+        if capacidade is None and restante is None:
+            return
+        self._em_segundo_plano(
+            self._gravar_headers, capacidade, None if restante is None else float(restante), reset
+        )
+
+    def _gravar_headers(self, capacidade, restante, reset):
+        # Os tokens são reabastecidos até agora antes do limite dos headers;
+        # atualizado_em acompanha, senão o próximo _consumir conta o mesmo intervalo de novo
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+            UPDATE limite_api SET
+                capacidade = COALESCE(%s, capacidade),
+                tokens = LEAST(
+                    capacidade,
+                    tokens + GREATEST(EXTRACT(EPOCH FROM clock_timestamp() - atualizado_em)::float8, 0)
+                             * capacidade / janela_s,
+                    %s
+                ),
+                atualizado_em = clock_timestamp(),
+                bloqueado_ate = CASE
+                    WHEN %s IS NULL THEN bloqueado_ate
+                    ELSE GREATEST(bloqueado_ate, to_timestamp(%s))
+                END
+            WHERE chave = %s
+            """, (capacidade, restante, reset, reset, self.chave))
+        self.conn.commit()
+
+    def bloquear(self, segundos):
+        self._em_segundo_plano(self._gravar_bloqueio, segundos)
+
+    def _gravar_bloqueio(self, segundos):
+        with self.conn.cursor() as cursor:
+            cursor.execute("""
+            UPDATE limite_api SET
+                tokens = 0,
+                bloqueado_ate = GREATEST(bloqueado_ate, clock_timestamp() + make_interval(secs => %s))
+            WHERE chave = %s
+            """, (float(segundos), self.chave))
+        self.conn.commit()
@@ -0,0 +1,190 @@
+# metricas.py
+# Instrumentação dos importadores: duração de cada fase (spans) e contadores
+# de chamadas à API por endpoint. No fim da execução vira um registro JSON
+# (arquivo e, opcionalmente, a tabela metricas_execucao no banco).
+import os
+import re
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICAS_DIR = os.environ.get("PUBG_METRICAS_DIR", ".metricas")
+# Com PUBG_METRICAS_DB=1 o registro também vai para a tabela metricas_execucao
+METRICAS_NO_BANCO = os.environ.get("PUBG_METRICAS_DB") == "1"
+
+# Ordem importa: o primeiro padrão que casar com o caminho dá o nome do endpoint
+_ENDPOINTS = [
+    ("partida", re.compile(r"/matches/[^/?]+$")),
+    ("stats_temporada", re.compile(r"/players/[^/?]+/seasons/[^/?]+$")),
+    ("jogador", re.compile(r"/players/[^/?]+$")),
+    ("jogadores", re.compile(r"/players$")),
+    ("temporadas", re.compile(r"/seasons$")),
+]
+
+
+def tipo_endpoint(url):
+    caminho = url.split("?", 1)[0].rstrip("/")
+    for nome, padrao in _ENDPOINTS:
+        if padrao.search(caminho):
+            return nome
+    return "outro"
+
+
+def _agora_iso():
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class Metricas:
+    """Spans das fases e contadores por endpoint de uma execução."""
+
+    def __init__(self, script="desconhecido"):
+        self.script = script
+        self.inicio = time.time()
+        self.inicio_iso = _agora_iso()
+        self.fases = []
+        self.endpoints = {}
+        self.contadores = {}
+        self._pilha = []
+
+    @contextmanager
+    def fase(self, nome, **atributos):
+        """Mede o bloco; fases aninhadas guardam o nome da fase pai."""
+        span = {"nome": nome, "inicio": round(time.time() - self.inicio, 3)}
+        if self._pilha:
+            span["pai"] = self._pilha[-1]["nome"]
+        if atributos:
+            span["atributos"] = atributos
+        self._pilha.append(span)
+        inicio = time.perf_counter()
+        try:
+            yield span
+        except BaseException as e:
+            span["erro"] = type(e).__name__
+            raise
+        finally:
+            span["duracao_s"] = round(time.perf_counter() - inicio, 4)
+            self._pilha.remove(span)
+            self.fases.append(span)
+
+    def _endpoint(self, url):
+        nome = tipo_endpoint(url)
+        if nome not in self.endpoints:
+            self.endpoints[nome] = {
+                "requisicoes": 0, "bytes": 0, "status": {}, "429": 0,
+                "retentativas": 0, "erros_conexao": 0, "tempo_s": 0.0,
+                "espera_limite_s": 0.0, "espera_backoff_s": 0.0,
+            }
+        return self.endpoints[nome]
+
+    def requisicao(self, url, status, tamanho, duracao):
+        e = self._endpoint(url)
+        e["requisicoes"] += 1
+        e["bytes"] += tamanho or 0
+        e["tempo_s"] += duracao
+        e["status"][str(status)] = e["status"].get(str(status), 0) + 1
+        if status == 429:
+            e["429"] += 1
+
+    def erro_conexao(self, url, duracao):
+        e = self._endpoint(url)
+        e["erros_conexao"] += 1
+        e["tempo_s"] += duracao
+
+    def retentativa(self, url):
+        self._endpoint(url)["retentativas"] += 1
+
+    def espera(self, url, segundos, motivo="backoff"):
+        """motivo: "limite" (token bucket / Retry-After) ou "backoff" (5xx, conexão).
+
+        No cliente assíncrono as esperas de tarefas concorrentes se somam, então
+        o total pode passar da duração da fase.
+        """
+        self._endpoint(url)[f"espera_{motivo}_s"] += segundos
+
+    def contar(self, nome, quantidade=1):
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    def registro(self, **extra):
+        endpoints = {
+            nome: {k: (round(v, 3) if isinstance(v, float) else v) for k, v in e.items()}
+            for nome, e in self.endpoints.items()
+        }
+        total = {
+            campo: sum(e[campo] for e in self.endpoints.values())
+            for campo in ["requisicoes", "bytes", "429", "retentativas", "erros_conexao"]
+        }
+        total["espera_s"] = round(sum(
+            e["espera_limite_s"] + e["espera_backoff_s"] for e in self.endpoints.values()
+        ), 3)
+        duracao = time.time() - self.inicio
+        total["requisicoes_por_s"] = round(total["requisicoes"] / duracao, 3) if duracao else 0
+        return {
+            "script": self.script,
+            "inicio": self.inicio_iso,
+            "duracao_s": round(duracao, 3),
+            "fases": sorted(self.fases, key=lambda f: f["inicio"]),
+            "endpoints": endpoints,
+            "total": total,
+            "contadores": self.contadores,
+            **extra,
+        }
+
+    def gravar(self, database_url=None, **extra):
+        """Grava o registro em METRICAS_DIR e, se habilitado, no banco. Nunca derruba o script."""
+        registro = self.registro(**extra)
+        try:
+            os.makedirs(METRICAS_DIR, exist_ok=True)
+            carimbo = self.inicio_iso.replace(":", "").replace("-", "")
+            caminho = os.path.join(METRICAS_DIR, f"{self.script}-{carimbo}.json")
+            with open(caminho, "w") as f:
+                json.dump(registro, f, indent=2, ensure_ascii=False)
+            print(f"📈 Métricas gravadas em {caminho}")
+        except OSError as e:
+            print(f"⚠️ Não foi possível gravar as métricas: {e}")
+
+        if METRICAS_NO_BANCO and database_url:
+            try:
+                gravar_no_banco(database_url, registro)
+            except Exception as e:
+                print(f"⚠️ Não foi possível gravar as métricas no banco: {e}")
+        return registro
+
+
+def gravar_no_banco(database_url, registro):
+    import psycopg2
+    from psycopg2.extras import Json
+
+    conn = psycopg2.connect(database_url)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS metricas_execucao (
+                    id BIGSERIAL PRIMARY KEY,
+                    script TEXT NOT NULL,
+                    inicio TIMESTAMPTZ NOT NULL,
+                    duracao_s DOUBLE PRECISION,
+                    registro JSONB NOT NULL
+                )
+            """)
+            cursor.execute(
+                "INSERT INTO metricas_execucao (script, inicio, duracao_s, registro) VALUES (%s, %s, %s, %s)",
+                (registro["script"], registro["inicio"], registro["duracao_s"], Json(registro))
+            )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_metricas = Metricas()
+
+
+def metricas():
+    """Instância da execução atual, compartilhada pelos clientes da API."""
+    return _metricas
+
+
+def iniciar_metricas(script):
+    global _metricas
+    _metricas = Metricas(script)
+    return _metricas
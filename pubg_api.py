@@ -0,0 +1,269 @@
+# pubg_api.py
+import os
+import time
+import json
+import random
+import asyncio
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from metricas import metricas
+
+API_KEY = os.environ.get("PUBG_API_KEY")
+# PUBG_BASE_URL aponta os importadores para outro servidor (ex.: pubg_fake_api.py)
+BASE_URL = os.environ.get("PUBG_BASE_URL", "https://api.pubg.com/shards/steam").rstrip("/")
+
+HEADERS = {
+    "Authorization": f"Bearer {API_KEY}",
+    "Accept": "application/vnd.api+json",
+    "Accept-Encoding": "gzip"
+}
+
+# Limite padrão de uma chave da PUBG: 10 requisições por minuto.
+# Os headers X-RateLimit-* da própria API corrigem esse valor em tempo real.
+LIMITE_POR_MINUTO = int(os.environ.get("PUBG_RATE_LIMIT", 10))
+MAX_CONEXOES = 20
+TENTATIVAS = 4
+
+
+def endpoint_limitado(url):
+    # /matches (e telemetria) não contam para o rate limit da PUBG
+    return "/matches/" not in url
+
+
+def backoff(tentativa, base=1.0, teto=30.0):
+    # Backoff exponencial com "full jitter": espalha as novas tentativas
+    return random.uniform(0, min(teto, base * (2 ** tentativa)))
+
+
+def espera_429(headers, tentativa):
+    retry_after = headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return int(retry_after)
+    return 10 + backoff(tentativa)
+
+
+def avisar_status(status, url):
+    if status == 401:
+        print("❌ API Key inválida ou expirada.")
+    elif status == 404:
+        print(f"⚠️ Recurso não encontrado: {url}")
+    else:
+        print(f"❌ Erro {status} em {url}")
+
+
+class ClientePubg:
+    """Cliente síncrono compartilhado: conexões keep-alive, gzip e retry com jitter.
+
+    Reaproveita a mesma ``requests.Session`` entre chamadas, então o handshake
+    TLS acontece uma vez por host. 429 e 5xx são repetidos; 401/404 não.
+    """
+
+    def __init__(self, tentativas=TENTATIVAS, max_conexoes=MAX_CONEXOES):
+        self.tentativas = tentativas
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_conexoes)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def requisitar(self, url):
+        m = metricas()
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                m.retentativa(url)
+            inicio = time.perf_counter()
+            try:
+                res = self.session.get(url, timeout=30)
+            except requests.RequestException as e:
+                m.erro_conexao(url, time.perf_counter() - inicio)
+                espera = backoff(tentativa)
+                print(f"❌ Erro de conexão em {url}: {e} (tentativa {tentativa + 1}/{self.tentativas})")
+                m.espera(url, espera)
+                time.sleep(espera)
+                continue
+            m.requisicao(url, res.status_code, len(res.content), time.perf_counter() - inicio)
+
+            if res.status_code == 429:
+                espera = espera_429(res.headers, tentativa)
+                print(f"⏳ Rate limit atingido, aguardando {round(espera, 1)}s... (tentativa {tentativa + 1}/{self.tentativas})")
+                m.espera(url, espera, "limite")
+                time.sleep(espera)
+                continue
+            if res.status_code >= 500:
+                espera = backoff(tentativa)
+                print(f"❌ Erro {res.status_code} em {url} (tentativa {tentativa + 1}/{self.tentativas})")
+                m.espera(url, espera)
+                time.sleep(espera)
+                continue
+            return res
+
+        print(f"❌ Falhou após {self.tentativas} tentativas: {url}")
+        return None
+
+    def get_json(self, url):
+        res = self.requisitar(url)
+        if res is None:
+            return None
+        if res.status_code == 200:
+            return res.json()
+        avisar_status(res.status_code, url)
+        return None
+
+    def close(self):
+        self.session.close()
+
+
+_cliente = None
+
+
+def cliente_padrao():
+    """Instância única do cliente síncrono, compartilhada pelo processo."""
+    global _cliente
+    if _cliente is None:
+        _cliente = ClientePubg()
+    return _cliente
+
+
+class TokenBucket:
+    """Token bucket guiado pelos headers X-RateLimit-Remaining/X-RateLimit-Reset.
+
+    Sem informação da API, repõe tokens na taxa de ``capacidade`` por minuto.
+    Quando a API informa que a janela esgotou, todos aguardam o reset.
+    """
+
+    def __init__(self, capacidade=LIMITE_POR_MINUTO, janela=60.0):
+        self.capacidade = capacidade
+        self.janela = janela
+        self.tokens = float(capacidade)
+        self.ultimo = time.monotonic()
+        self.reset_em = None  # epoch em que a janela da API reinicia
+        self._lock = asyncio.Lock()
+        self._mudou = asyncio.Event()
+
+    def _repor(self):
+        agora = time.monotonic()
+        taxa = self.capacidade / self.janela
+        self.tokens = min(self.capacidade, self.tokens + (agora - self.ultimo) * taxa)
+        self.ultimo = agora
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                if self.reset_em is not None:
+                    espera = self.reset_em - time.time()
+                    if espera > 0:
+                        print(f"⏳ Limite da API esgotado. Aguardando {round(espera, 1)}s...")
+                        await asyncio.sleep(espera)
+                    self.reset_em = None
+                    self.tokens = float(self.capacidade)
+                    self.ultimo = time.monotonic()
+
+                self._repor()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                # Acorda antes se uma resposta trouxer headers novos
+                self._mudou.clear()
+                espera = (1 - self.tokens) * self.janela / self.capacidade
+                try:
+                    await asyncio.wait_for(self._mudou.wait(), timeout=espera)
+                except asyncio.TimeoutError:
+                    pass
+
+    def atualizar(self, headers):
+        limite = headers.get("X-RateLimit-Limit")
+        restante = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+
+        if limite and limite.isdigit() and int(limite) > 0:
+            self.capacidade = int(limite)
+        if restante is None or not restante.isdigit():
+            return
+
+        self.tokens = min(self.tokens, float(restante))
+        if int(restante) == 0 and reset and reset.isdigit():
+            self.reset_em = max(self.reset_em or 0, int(reset))
+        self._mudou.set()
+
+    def bloquear(self, segundos):
+        self.tokens = 0.0
+        self.reset_em = max(self.reset_em or 0, time.time() + segundos)
+        self._mudou.set()
+
+
+class ClientePubgAsync:
+    """Sessão aiohttp única com token bucket para os endpoints limitados.
+
+    ``bucket`` substitui o TokenBucket local (ex.: fila_jobs.TokenBucketBanco,
+    dividido entre vários workers).
+    """
+
+    def __init__(self, max_conexoes=MAX_CONEXOES, limite=LIMITE_POR_MINUTO, bucket=None):
+        self.max_conexoes = max_conexoes
+        self.bucket = bucket or TokenBucket(limite)
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(
+            headers=HEADERS,
+            connector=aiohttp.TCPConnector(limit=self.max_conexoes),
+            timeout=aiohttp.ClientTimeout(total=60)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def get_json(self, url, tentativas=TENTATIVAS):
+        bruto = await self.get_bytes(url, tentativas)
+        return json.loads(bruto) if bruto is not None else None
+
+    async def get_bytes(self, url, tentativas=TENTATIVAS):
+        limitado = endpoint_limitado(url)
+        m = metricas()
+        for tentativa in range(tentativas):
+            if tentativa:
+                m.retentativa(url)
+            if limitado:
+                # Tempo na fila do token bucket (inclui bloqueios por 429)
+                inicio = time.perf_counter()
+                await self.bucket.adquirir()
+                m.espera(url, time.perf_counter() - inicio, "limite")
+            inicio = time.perf_counter()
+            try:
+                async with self.session.get(url) as res:
+                    if limitado:
+                        self.bucket.atualizar(res.headers)
+                    if res.status == 429:
+                        m.requisicao(url, res.status, 0, time.perf_counter() - inicio)
+                        espera = espera_429(res.headers, tentativa)
+                        print(f"⏳ Rate limit. Aguardando {round(espera, 1)}s...")
+                        if limitado:
+                            self.bucket.bloquear(espera)
+                        else:
+                            m.espera(url, espera, "limite")
+                            await asyncio.sleep(espera)
+                        continue
+                    if res.status >= 500:
+                        m.requisicao(url, res.status, 0, time.perf_counter() - inicio)
+                        print(f"❌ Erro {res.status} em {url} (tentativa {tentativa + 1}/{tentativas})")
+                        espera = backoff(tentativa)
+                        m.espera(url, espera)
+                        await asyncio.sleep(espera)
+                        continue
+                    if res.status != 200:
+                        m.requisicao(url, res.status, 0, time.perf_counter() - inicio)
+                        avisar_status(res.status, url)
+                        return None
+                    bruto = await res.read()
+                    m.requisicao(url, res.status, len(bruto), time.perf_counter() - inicio)
+                    return bruto
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                m.erro_conexao(url, time.perf_counter() - inicio)
+                print(f"❌ Erro em {url}: {e} (tentativa {tentativa + 1}/{tentativas})")
+                espera = backoff(tentativa)
+                m.espera(url, espera)
+                await asyncio.sleep(espera)
+        print(f"❌ Falhou após {tentativas} tentativas: {url}")
+        return None
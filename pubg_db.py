@@ -0,0 +1,68 @@
+# pubg_db.py
+import io
+from datetime import date, datetime
+
+# Chave do advisory lock que garante um único pubg_import.py rodando por vez
+TRAVA_IMPORTACAO = 4141001
+# Serializa os CREATE TABLE IF NOT EXISTS de processos que sobem juntos (workers)
+TRAVA_ESQUEMA = 4141002
+
+
+def _valor_copy(valor):
+    if valor is None:
+        return "\\N"
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    texto = str(valor)
+    return (
+        texto.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copiar_para_staging(cursor, staging, tabela, colunas, linhas):
+    """Carrega ``linhas`` numa tabela temporária com os tipos de ``tabela``, via COPY.
+
+    A tabela temporária some no commit; o merge para a tabela real é feito
+    por quem chamou, com INSERT ... SELECT ... ON CONFLICT.
+    """
+    lista = ", ".join(colunas)
+    cursor.execute(
+        f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+        f"SELECT {lista} FROM {tabela} WITH NO DATA"
+    )
+    buffer = io.StringIO()
+    for linha in linhas:
+        buffer.write("\t".join(_valor_copy(v) for v in linha))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {staging} ({lista}) FROM STDIN", buffer)
+
+
+def linha_distinta(tabela, colunas, origem="EXCLUDED"):
+    """Guarda ``IS DISTINCT FROM`` para pular upserts que não mudam nada."""
+    atuais = ", ".join(f"{tabela}.{c}" for c in colunas)
+    novos = ", ".join(f"{origem}.{c}" for c in colunas)
+    return f"({atuais}) IS DISTINCT FROM ({novos})"
+
+
+def tentar_trava(cursor, chave, compartilhada=False):
+    """pg_try_advisory_lock de sessão: fica com a conexão até ela fechar.
+
+    A versão compartilhada convive com outras compartilhadas (workers da fila)
+    e exclui só a exclusiva (execução normal).
+    """
+    funcao = "pg_try_advisory_lock_shared" if compartilhada else "pg_try_advisory_lock"
+    cursor.execute(f"SELECT {funcao}(%s)", (chave,))
+    return cursor.fetchone()[0]
+
+
+def travar_esquema(cursor):
+    """pg_advisory_xact_lock antes de criar tabelas; solta no commit.
+
+    CREATE TABLE IF NOT EXISTS em duas conexões ao mesmo tempo ainda pode
+    falhar com chave duplicada em pg_type.
+    """
+    cursor.execute("SELECT pg_advisory_xact_lock(%s)", (TRAVA_ESQUEMA,))
@@ -0,0 +1,424 @@
+# pubg_fake_api.py
+# Servidor local que imita a API da PUBG para medir o pubg_import.py e o
+# anti_casual.py sem gastar a chave real: throughput, concorrência e 429.
+#
+#   python pubg_fake_api.py --porta 8089 --limite 10 --janela 60 --latencia-ms 120
+#   PUBG_BASE_URL=http://localhost:8089/shards/steam PUBG_API_KEY=fake python pubg_import.py
+#
+# Serve /seasons, /players?filter[playerNames|playerIds]=..., /players/{id},
+# /players/{id}/seasons/{season} e /matches/{id}. As respostas vêm de fixtures
+# gravadas (--fixtures, e as partidas do cache local) ou são geradas de forma
+# determinística a partir da semente. GET /_metricas devolve os contadores.
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from aiohttp import web
+from cache_partidas import CACHE_DIR
+
+TEMPORADAS = [
+    "division.bro.official.pc-2018-39",
+    "division.bro.official.pc-2018-40",
+    "division.bro.official.pc-2018-41",
+]
+MODOS = ["solo", "solo-fpp", "duo", "duo-fpp", "squad", "squad-fpp"]
+MAPAS = ["Baltic_Main", "Desert_Main", "Savage_Main", "Tiger_Main", "Neon_Main"]
+
+# Primeira partida gerada; as seguintes vêm a cada INTERVALO_PARTIDAS
+INICIO_PARTIDAS = datetime(2026, 4, 8, tzinfo=timezone.utc)
+INTERVALO_PARTIDAS = timedelta(minutes=25)
+
+# Quantas partidas /players devolve por jogador (a API real também corta)
+PARTIDAS_POR_JOGADOR = 30
+
+
+def _rng(*partes):
+    """random.Random determinístico a partir de qualquer combinação de valores."""
+    semente = hashlib.sha1("|".join(str(p) for p in partes).encode()).hexdigest()
+    return random.Random(int(semente[:16], 16))
+
+
+def _data(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MundoFake:
+    """Jogadores, partidas e stats gerados sob demanda, sempre iguais para a mesma semente.
+
+    Cada partida é um número de série; o jogador participa de uma série quando
+    o hash (jogador, série) cai abaixo de ``participacao``. Com ``nova_partida_s``
+    uma nova série aparece a cada tantos segundos, o que simula gente jogando
+    entre um sync e outro.
+    """
+
+    def __init__(self, semente=41, participacao=0.08, nova_partida_s=0, series_iniciais=2000):
+        self.semente = semente
+        self.participacao = participacao
+        self.nova_partida_s = nova_partida_s
+        self.series_iniciais = series_iniciais
+        self.iniciado = time.time()
+        self.nomes = {}  # account id -> nome
+        self.series = {}  # match id -> série, preenchido ao gerar os ids
+
+    def registrar(self, nome):
+        account_id = "account." + hashlib.md5(f"{self.semente}|{nome}".encode()).hexdigest()
+        self.nomes[account_id] = nome
+        return account_id
+
+    def nome(self, account_id):
+        return self.nomes.setdefault(account_id, account_id.split(".")[-1][:12])
+
+    def ultima_serie(self):
+        if self.nova_partida_s <= 0:
+            return self.series_iniciais
+        return self.series_iniciais + int((time.time() - self.iniciado) // self.nova_partida_s)
+
+    def match_id(self, serie):
+        match_id = str(uuid.UUID(hashlib.md5(f"{self.semente}|partida|{serie}".encode()).hexdigest()))
+        self.series[match_id] = serie
+        return match_id
+
+    def joga(self, account_id, serie):
+        return _rng(self.semente, account_id, serie).random() < self.participacao
+
+    def series_do_jogador(self, account_id, limite=PARTIDAS_POR_JOGADOR):
+        series = []
+        serie = self.ultima_serie()
+        while serie > 0 and len(series) < limite:
+            if self.joga(account_id, serie):
+                series.append(serie)
+            serie -= 1
+        return series
+
+    def serie_da_partida(self, match_id):
+        if match_id in self.series:
+            return self.series[match_id]
+        # Partidas recentes primeiro: é o que os importadores pedem
+        for serie in range(self.ultima_serie(), 0, -1):
+            if self.match_id(serie) == match_id:
+                return serie
+        return None
+
+    # ---------- payloads ----------
+
+    def jogador(self, account_id):
+        return {
+            "type": "player",
+            "id": account_id,
+            "attributes": {"name": self.nome(account_id), "shardId": "steam"},
+            "relationships": {"matches": {"data": [
+                {"type": "match", "id": self.match_id(s)} for s in self.series_do_jogador(account_id)
+            ]}},
+        }
+
+    def temporadas(self):
+        return {"data": [
+            {"type": "season", "id": s, "attributes": {"isCurrentSeason": s == TEMPORADAS[-1], "isOffseason": False}}
+            for s in TEMPORADAS
+        ]}
+
+    def stats_temporada(self, account_id, season_id):
+        rng = _rng(self.semente, account_id, season_id)
+        # Partidas jogadas crescem junto com as séries novas
+        extra = sum(
+            1 for s in range(self.series_iniciais + 1, self.ultima_serie() + 1) if self.joga(account_id, s)
+        )
+        modos = {}
+        for modo in MODOS:
+            rounds = rng.randint(0, 40) + (extra if modo == "squad" else 0)
+            kills = int(rounds * rng.uniform(0.3, 3.0))
+            modos[modo] = {
+                "roundsPlayed": rounds,
+                "kills": kills,
+                "wins": int(rounds * rng.uniform(0, 0.15)),
+                "top10s": int(rounds * rng.uniform(0.2, 0.5)),
+                "assists": int(rounds * rng.uniform(0, 1.0)),
+                "headshotKills": int(kills * rng.uniform(0.1, 0.4)),
+                "revives": int(rounds * rng.uniform(0, 0.6)),
+                "damageDealt": round(rounds * rng.uniform(80, 400), 2),
+                "longestKill": round(rng.uniform(0, 600) if kills else 0.0, 2),
+                "dBNOs": int(kills * rng.uniform(0.8, 1.2)),
+                "losses": rounds,
+                "timeSurvived": round(rounds * rng.uniform(600, 1500), 2),
+                "walkDistance": round(rounds * rng.uniform(800, 2500), 2),
+                "heals": int(rounds * rng.uniform(1, 6)),
+                "boosts": int(rounds * rng.uniform(1, 5)),
+            }
+        return {"data": {
+            "type": "playerSeason",
+            "attributes": {"gameModeStats": modos},
+            "relationships": {
+                "player": {"data": {"type": "player", "id": account_id}},
+                "season": {"data": {"type": "season", "id": season_id}},
+            },
+        }}
+
+    def _participante(self, rng, account_id, nome, win_place):
+        kills = rng.choices(range(8), weights=[40, 25, 14, 8, 5, 4, 2, 2])[0]
+        return {
+            "type": "participant",
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "attributes": {"actor": "", "shardId": "steam", "stats": {
+                "playerId": account_id,
+                "name": nome,
+                "kills": kills,
+                "assists": rng.randint(0, 3),
+                "headshotKills": rng.randint(0, kills),
+                "damageDealt": round(kills * rng.uniform(80, 140) + rng.uniform(0, 120), 2),
+                "DBNOs": kills,
+                "revives": rng.randint(0, 2),
+                "longestKill": round(rng.uniform(0, 400) if kills else 0.0, 2),
+                "winPlace": win_place,
+                "timeSurvived": round(rng.uniform(60, 1900), 2),
+                "walkDistance": round(rng.uniform(0, 4000), 2),
+                "deathType": "alive" if win_place == 1 else "byplayer",
+            }},
+        }
+
+    def partida(self, match_id):
+        serie = self.serie_da_partida(match_id)
+        if serie is None:
+            return None
+        rng = _rng(self.semente, "partida", serie)
+        casual = rng.random() < 0.2
+        modo = "squad" if rng.random() < 0.85 else rng.choice(["duo", "squad-fpp"])
+        created_at = INICIO_PARTIDAS + INTERVALO_PARTIDAS * serie
+
+        # Jogadores conhecidos que estavam nessa partida vão no mesmo time
+        conhecidos = [a for a in self.nomes if self.joga(a, serie)]
+        win_place = rng.randint(1, 25)
+        participantes = [self._participante(rng, a, self.nomes[a], win_place) for a in conhecidos]
+
+        humanos = rng.randint(4, 12) if casual else rng.randint(60, 64)
+        total = 64 if casual else rng.randint(90, 100)
+        for i in range(len(participantes), total):
+            if i < humanos:
+                account_id = f"account.{rng.getrandbits(128):032x}"
+            else:
+                account_id = f"ai.{i}"
+            participantes.append(self._participante(rng, account_id, f"P{i}", rng.randint(1, 25)))
+
+        return {
+            "data": {
+                "type": "match",
+                "id": match_id,
+                "attributes": {
+                    "createdAt": _data(created_at),
+                    "duration": rng.randint(1200, 2000),
+                    "gameMode": modo,
+                    "matchType": "casual" if casual else "official",
+                    "mapName": rng.choice(MAPAS),
+                    "isCustomMatch": False,
+                    "seasonState": "progress",
+                    "shardId": "steam",
+                },
+            },
+            "included": participantes + [{
+                "type": "asset",
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "attributes": {"name": "telemetry", "URL": f"https://telemetry-cdn.example/{match_id}.json"},
+            }],
+        }
+
+
+class Fixtures:
+    """Respostas gravadas: DIR/seasons.json, DIR/players/{id}.json,
+    DIR/stats/{id}_{season}.json e DIR/matches/{id}.json; as partidas também
+    podem vir do cache local (.json.gz) dos importadores."""
+
+    def __init__(self, diretorio=None, dir_partidas=None):
+        self.diretorio = diretorio
+        self.dir_partidas = dir_partidas
+
+    def ler(self, *caminho):
+        if not self.diretorio:
+            return None
+        arquivo = os.path.join(self.diretorio, *caminho)
+        if not os.path.exists(arquivo):
+            return None
+        with open(arquivo, "rb") as f:
+            return f.read()
+
+    def partida(self, match_id):
+        bruto = self.ler("matches", f"{match_id}.json")
+        if bruto is None and self.dir_partidas:
+            arquivo = os.path.join(self.dir_partidas, f"{match_id}.json.gz")
+            if os.path.exists(arquivo):
+                with gzip.open(arquivo, "rb") as f:
+                    bruto = f.read()
+        return bruto
+
+
+class JanelaLimite:
+    """Rate limit por chave em janela fixa, com os headers da PUBG."""
+
+    def __init__(self, limite, janela):
+        self.limite = limite
+        self.janela = janela
+        self.janelas = {}  # chave -> (início, usadas)
+
+    def consumir(self, chave):
+        agora = time.time()
+        inicio, usadas = self.janelas.get(chave, (agora, 0))
+        if agora - inicio >= self.janela:
+            inicio, usadas = agora, 0
+        usadas += 1
+        self.janelas[chave] = (inicio, usadas)
+        reset = inicio + self.janela
+        headers = {
+            "X-RateLimit-Limit": str(self.limite),
+            "X-RateLimit-Remaining": str(max(self.limite - usadas, 0)),
+            "X-RateLimit-Reset": str(int(reset) + 1),
+        }
+        if usadas > self.limite:
+            headers["Retry-After"] = str(max(int(reset - agora) + 1, 1))
+            return False, headers
+        return True, headers
+
+
+def criar_app(mundo, fixtures, limite, janela, latencia_ms=0, jitter_ms=0,
+              erro_5xx=0.0, erro_429=0.0, erro_conexao=0.0, semente=41):
+    metricas = {"requisicoes": {}, "status": {}, "bytes": 0, "429": 0, "erros_injetados": 0}
+    controle = JanelaLimite(limite, janela)
+    sorteio = random.Random(semente)
+
+    def contar(tipo, status, tamanho=0):
+        metricas["requisicoes"][tipo] = metricas["requisicoes"].get(tipo, 0) + 1
+        metricas["status"][str(status)] = metricas["status"].get(str(status), 0) + 1
+        metricas["bytes"] += tamanho
+
+    def responder(request, tipo, corpo, headers):
+        if isinstance(corpo, (dict, list)):
+            corpo = json.dumps(corpo).encode()
+        resposta = web.Response(body=corpo, content_type="application/vnd.api+json", headers=headers)
+        if "gzip" in request.headers.get("Accept-Encoding", ""):
+            resposta.enable_compression()
+        contar(tipo, 200, len(corpo))
+        return resposta
+
+    def erro(tipo, status, headers=None, detalhe=""):
+        contar(tipo, status)
+        corpo = json.dumps({"errors": [{"title": detalhe or str(status)}]})
+        return web.Response(status=status, text=corpo, content_type="application/vnd.api+json", headers=headers or {})
+
+    @web.middleware
+    async def simular_rede(request, handler):
+        if request.path.startswith("/_"):
+            return await handler(request)
+        tipo = request.match_info.route.name or "desconhecido"
+
+        if latencia_ms or jitter_ms:
+            await asyncio.sleep(max(latencia_ms + sorteio.uniform(-jitter_ms, jitter_ms), 0) / 1000)
+
+        if not request.headers.get("Authorization", "").startswith("Bearer "):
+            return erro(tipo, 401, detalhe="Unauthorized")
+
+        headers = {}
+        # Como na API real, /matches não conta para o rate limit
+        if tipo != "partida":
+            permitido, headers = controle.consumir(request.headers["Authorization"])
+            if not permitido:
+                metricas["429"] += 1
+                return erro(tipo, 429, headers, "Too Many Requests")
+
+        sorte = sorteio.random()
+        if sorte < erro_conexao:
+            metricas["erros_injetados"] += 1
+            contar(tipo, "conexao")
+            request.transport.close()
+            raise asyncio.CancelledError()
+        if sorte < erro_conexao + erro_5xx:
+            metricas["erros_injetados"] += 1
+            return erro(tipo, sorteio.choice([500, 502, 503]), headers)
+        if sorte < erro_conexao + erro_5xx + erro_429:
+            metricas["erros_injetados"] += 1
+            metricas["429"] += 1
+            return erro(tipo, 429, {**headers, "Retry-After": "1"}, "Too Many Requests")
+
+        request["headers_limite"] = headers
+        return await handler(request)
+
+    async def temporadas(request):
+        corpo = fixtures.ler("seasons.json") or mundo.temporadas()
+        return responder(request, "temporadas", corpo, request["headers_limite"])
+
+    async def jogadores(request):
+        nomes = [n for n in request.query.get("filter[playerNames]", "").split(",") if n]
+        ids = [i for i in request.query.get("filter[playerIds]", "").split(",") if i]
+        if len(nomes) + len(ids) > 10:
+            return erro("jogadores", 400, request["headers_limite"], "Too many players")
+        ids += [mundo.registrar(nome) for nome in nomes]
+        if not ids:
+            return erro("jogadores", 400, request["headers_limite"], "Missing filter")
+        dados = []
+        for account_id in ids:
+            gravado = fixtures.ler("players", f"{account_id}.json")
+            dados.append(json.loads(gravado)["data"] if gravado else mundo.jogador(account_id))
+        return responder(request, "jogadores", {"data": dados}, request["headers_limite"])
+
+    async def jogador(request):
+        account_id = request.match_info["account_id"]
+        corpo = fixtures.ler("players", f"{account_id}.json") or {"data": mundo.jogador(account_id)}
+        return responder(request, "jogador", corpo, request["headers_limite"])
+
+    async def stats(request):
+        account_id, season_id = request.match_info["account_id"], request.match_info["season_id"]
+        corpo = fixtures.ler("stats", f"{account_id}_{season_id}.json") or mundo.stats_temporada(account_id, season_id)
+        return responder(request, "stats", corpo, request["headers_limite"])
+
+    async def partida(request):
+        match_id = request.match_info["match_id"]
+        corpo = fixtures.partida(match_id) or mundo.partida(match_id)
+        if corpo is None:
+            return erro("partida", 404, detalhe="Not Found")
+        return responder(request, "partida", corpo, request["headers_limite"])
+
+    async def ver_metricas(request):
+        return web.json_response(metricas)
+
+    app = web.Application(middlewares=[simular_rede])
+    app.router.add_get("/shards/{shard}/seasons", temporadas, name="temporadas")
+    app.router.add_get("/shards/{shard}/players", jogadores, name="jogadores")
+    app.router.add_get("/shards/{shard}/players/{account_id}", jogador, name="jogador")
+    app.router.add_get("/shards/{shard}/players/{account_id}/seasons/{season_id}", stats, name="stats")
+    app.router.add_get("/shards/{shard}/matches/{match_id}", partida, name="partida")
+    app.router.add_get("/_metricas", ver_metricas)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API fake da PUBG para testes locais")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8089)
+    parser.add_argument("--semente", type=int, default=41)
+    parser.add_argument("--limite", type=int, default=10, help="requisições por janela e por chave")
+    parser.add_argument("--janela", type=float, default=60, help="duração da janela do rate limit (s)")
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--erro-5xx", type=float, default=0.0, help="fração de respostas 500/502/503")
+    parser.add_argument("--erro-429", type=float, default=0.0, help="fração de 429 extras, fora da janela")
+    parser.add_argument("--erro-conexao", type=float, default=0.0, help="fração de conexões derrubadas")
+    parser.add_argument("--participacao", type=float, default=0.08,
+                        help="chance de um jogador estar em cada partida gerada")
+    parser.add_argument("--nova-partida-s", type=float, default=0,
+                        help="gera uma partida nova a cada N segundos (0 = mundo estático)")
+    parser.add_argument("--fixtures", help="diretório com respostas gravadas")
+    parser.add_argument("--partidas-cache", default=CACHE_DIR,
+                        help="cache de partidas (.json.gz) usado como fixture de /matches")
+    args = parser.parse_args()
+
+    mundo = MundoFake(args.semente, args.participacao, args.nova_partida_s)
+    fixtures = Fixtures(args.fixtures, args.partidas_cache)
+    app = criar_app(
+        mundo, fixtures, args.limite, args.janela, args.latencia_ms, args.jitter_ms,
+        args.erro_5xx, args.erro_429, args.erro_conexao, args.semente
+    )
+    print(f"🎮 API fake da PUBG em http://{args.host}:{args.porta}/shards/steam "
+          f"(limite {args.limite}/{args.janela:g}s, latência {args.latencia_ms:g}±{args.jitter_ms:g}ms)")
+    web.run_app(app, host=args.host, port=args.porta, print=None)
@@ -1,122 +1,48 @@
 # pubg_import.py
 import os
+import json
 import time
-import requests
+import asyncio
+import argparse
 import psycopg2
+from psycopg2.extras import execute_values
 from datetime import datetime, date, timedelta
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from pubg_api import BASE_URL, ClientePubgAsync, cliente_padrao
+from registro_jogadores import (
+    LOTE_API, ausentes, carregar_registro, garantir_registro, indexar_por_id, lotes,
+    marcar_para_resolver, resolver_pendentes, temporada_atual, url_por_ids
+)
+from cache_partidas import obter_resumo_async
+from metricas import iniciar_metricas, metricas
+from ranking_materializado import atualizar_ranking_materializado
+from pubg_db import TRAVA_IMPORTACAO, copiar_para_staging, linha_distinta, tentar_trava, travar_esquema
+from fila_jobs import (
+    TokenBucketBanco, aguardar_leases, concluir, contar_jobs, devolver, enfileirar,
+    finalizar_lote, garantir_fila, ler_lote, lote_padrao, nome_worker, reivindicar, reservar_lote, resumo_lote
+)
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
-API_KEY = os.environ.get("PUBG_API_KEY")
-BASE_URL = "https://api.pubg.com/shards/steam"
-
-headers = {
-    "Authorization": f"Bearer {API_KEY}",
-    "Accept": "application/vnd.api+json"
-}
-
-players = [
-    "Adrian-Wan", "MironoteuCool", "FabioEspeto", "Mamutag_Komander",
-    "Robson_Foz", "MEIRAA", "EL-LOCORJ", "SalaminhoKBD",
-    "nelio_ponto_dev", "CARNEIROOO", "Kowalski_PR", "Zacouteguy",
-    "Sidors", "Takato_Matsuki", "cmm01", "Petrala", "O-CARRASCO", "DET4N4KA", "LeandroTW2"
-]
-
-def fazer_requisicao(url):
-    for tentativa in range(3):
-        res = requests.get(url, headers=headers)
-        if res.status_code == 429:
-            retry_after = int(res.headers.get("Retry-After", 10))
-            print(f"⏳ Rate limit. Aguardando {retry_after}s...")
-            time.sleep(retry_after)
-            continue
-        return res
-    return None
-
-def dividir_lista(lista, tamanho):
-    for i in range(0, len(lista), tamanho):
-        yield lista[i:i + tamanho]
 
 def get_segunda_feira():
     hoje = date.today()
     return hoje - timedelta(days=hoje.weekday())
 
-inicio_total = time.time()
-print("🚀 Detectando temporada...")
-
-res_season = fazer_requisicao(f"{BASE_URL}/seasons")
-seasons = res_season.json()["data"]
-
-current_season = next(
-    (s for s in seasons if s["attributes"]["isCurrentSeason"]),
-    None
-)
+async def buscar_por_ids(cliente, grupo):
+    return indexar_por_id(await cliente.get_json(url_por_ids(grupo)))
 
-current_season_id = current_season["id"] if current_season else ""
-
-print(f"📅 Temporada atual: {current_season_id}")
-
-print("🔎 Buscando IDs e última partida em lote...")
-player_ids = {}
-player_last_match = {}
-
-for grupo in dividir_lista(players, 10):
-    nomes = ",".join(grupo)
-    res = fazer_requisicao(
-        f"{BASE_URL}/players?filter[playerNames]={nomes}"
-    )
-    if res and res.status_code == 200:
-        for p in res.json()["data"]:
-            nick = p["attributes"]["name"]
-            player_ids[nick] = p["id"]
-            matches = p["relationships"]["matches"]["data"]
-            if matches:
-                player_last_match[nick] = matches[0]["id"]
-
-print(f"✅ {len(player_ids)} IDs encontrados.")
-
-print("📅 Buscando data da última partida...")
-player_updated_at = {}
-
-def buscar_data_partida(nick, match_id):
-    res = fazer_requisicao(f"{BASE_URL}/matches/{match_id}")
-    if not res or res.status_code != 200:
+async def buscar_data_partida(cliente, nick, match_id):
+    # Só a data importa aqui: nenhuma stat de participante é guardada
+    resumo = await obter_resumo_async(cliente, match_id, ids=())
+    if not resumo:
         return nick, None
     try:
-        created_at = res.json()["data"]["attributes"]["createdAt"]
-        return nick, datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+        return nick, datetime.strptime(resumo.created_at, "%Y-%m-%dT%H:%M:%SZ")
     except Exception:
         return nick, None
 
-with ThreadPoolExecutor(max_workers=20) as executor:
-    futures = [
-        executor.submit(buscar_data_partida, nick, match_id)
-        for nick, match_id in player_last_match.items()
-    ]
-    for future in as_completed(futures):
-        nick, data = future.result()
-        player_updated_at[nick] = data
-        print(f"📅 {nick} | última partida: {data}")
-
-def buscar_stats(player, p_id):
-    url = f"{BASE_URL}/players/{p_id}/seasons/{current_season_id}"
-    res = fazer_requisicao(url)
-
-    if not res or res.status_code != 200:
-        return None
-
-    stats = res.json()["data"]["attributes"]["gameModeStats"].get("squad", {})
+def linha_stats(stats):
+    """Colunas de COLUNAS_STATS a partir de um modo de gameModeStats (com partidas > 0)."""
     partidas = stats.get("roundsPlayed", 0)
-
-    ultima_partida = player_updated_at.get(player, None)
-
-    if partidas == 0:
-        if ultima_partida:
-            print(f"⚠️ {player} sem partidas na API — atualizando apenas updated_at: {ultima_partida}")
-            return ("only_date", player, ultima_partida)
-        print(f"⚠️ {player} sem partidas na API e sem data disponível — ignorando")
-        return None
-
     kills = stats.get("kills", 0)
     vitorias = stats.get("wins", 0)
     assists = stats.get("assists", 0)
@@ -129,51 +55,208 @@ def buscar_stats(player, p_id):
     kr = round(kills / partidas, 2)
     dano_medio = int(dano_total / partidas)
 
-    print(f"⚡ {player} processado")
-
     return (
-        player, partidas, kr, vitorias, kills,
+        partidas, kr, vitorias, kills,
         dano_medio, assists, headshots,
-        revives, dist_max, top10, datetime.utcnow(), ultima_partida
+        revives, dist_max, top10
     )
 
-print("⚡ Buscando estatísticas em paralelo...")
+async def buscar_stats(cliente, player, p_id, season_id, ultima_partida):
+    """Retorna (resultado do squad, linhas de stats_modos) de uma única requisição."""
+    url = f"{BASE_URL}/players/{p_id}/seasons/{season_id}"
+    dados = await cliente.get_json(url)
+
+    if not dados:
+        return None, []
+
+    agora = datetime.utcnow()
+    game_mode_stats = dados["data"]["attributes"]["gameModeStats"]
+    # Todos os modos vêm na mesma resposta: rankings de outros modos não custam requisição
+    modos = [
+        (player, season_id, modo) + linha_stats(stats) + (json.dumps(stats), agora)
+        for modo, stats in game_mode_stats.items()
+        if stats.get("roundsPlayed", 0) > 0
+    ]
 
-resultados = []
-only_date_updates = []
+    stats = game_mode_stats.get("squad", {})
+    partidas = stats.get("roundsPlayed", 0)
 
-with ThreadPoolExecutor(max_workers=20) as executor:
-    futures = [
-        executor.submit(buscar_stats, player, p_id)
-        for player, p_id in player_ids.items()
-    ]
+    if partidas == 0:
+        if ultima_partida:
+            print(f"⚠️ {player} sem partidas na API — atualizando apenas updated_at: {ultima_partida}")
+            return ("only_date", player, ultima_partida), modos
+        print(f"⚠️ {player} sem partidas na API e sem data disponível — ignorando")
+        return None, modos
 
-    for future in as_completed(futures):
-        resultado = future.result()
-        if resultado is None:
-            continue
-        if resultado[0] == "only_date":
-            only_date_updates.append((resultado[2], resultado[1]))
-        else:
-            resultados.append(resultado)
+    print(f"⚡ {player} processado")
 
-print(f"✅ {len(resultados)} jogadores com stats válidas.")
-if only_date_updates:
-    print(f"📅 {len(only_date_updates)} jogador(es) com apenas updated_at para atualizar.")
+    return (player,) + linha_stats(stats) + (agora, ultima_partida), modos
 
-try:
-    conn = psycopg2.connect(DATABASE_URL)
-    cursor = conn.cursor()
+async def coletar_dados(jogadores, season_id, estado, completo=False, bucket=None):
+    """Busca a última partida, a data dela e as stats num único event loop.
 
-    # ===============================
-    # UPDATE RANKING_SQUAD
-    # ===============================
-    sql = """
-    INSERT INTO ranking_squad
-    (nick, partidas, kr, vitorias, kills, dano_medio,
-     assists, headshots, revives, kill_dist_max, top10, atualizado_em, updated_at)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ``jogadores``: nick -> account_id do cadastro. Jogadores cuja última
+    partida (e temporada) é a mesma registrada em ``estado`` não têm stats
+    nem data buscadas de novo. ``bucket``: token bucket compartilhado (modo worker).
+    """
+    player_ids = {}
+    nao_encontrados = []
+    player_last_match = {}
+    player_updated_at = {}
+    resultados = []
+    only_date_updates = []
+    linhas_modos = []
+
+    async with ClientePubgAsync(bucket=bucket) as cliente:
+        with metricas().fase("jogadores", jogadores=len(jogadores)):
+            print("🔎 Buscando última partida em lote pelos IDs do cadastro...")
+            grupos = list(lotes(jogadores.values()))
+            respostas = await asyncio.gather(*[buscar_por_ids(cliente, grupo) for grupo in grupos])
+            por_id = {}
+            sem_resposta = set()
+            for grupo, resposta in zip(grupos, respostas):
+                if resposta is None:
+                    # Lote que falhou não é ausência: o cadastro continua valendo
+                    print(f"⚠️ Falha ao buscar {len(grupo)} jogador(es) pelo id — ficam para o próximo sync")
+                    continue
+                por_id.update(resposta)
+                sem_resposta.update(ausentes(grupo, resposta))
+            for nick, account_id in jogadores.items():
+                p = por_id.get(account_id)
+                if p is None:
+                    if account_id in sem_resposta:
+                        nao_encontrados.append(nick)
+                    continue
+                if p["attributes"]["name"] != nick:
+                    print(f"⚠️ {nick} aparece na API como {p['attributes']['name']} — mantendo o nick do cadastro")
+                player_ids[nick] = account_id
+                matches = p["relationships"]["matches"]["data"]
+                if matches:
+                    player_last_match[nick] = matches[0]["id"]
+
+        print(f"✅ {len(player_ids)} de {len(jogadores)} jogadores encontrados.")
+
+        alterados = {
+            nick: p_id for nick, p_id in player_ids.items()
+            if completo or estado.get(nick) != (season_id, player_last_match.get(nick))
+        }
+        inalterados = [nick for nick in player_ids if nick not in alterados]
+        print(f"🔁 {len(alterados)} jogador(es) com partida nova | {len(inalterados)} sem mudança desde o último sync")
+
+        with metricas().fase("datas_partidas"):
+            print("📅 Buscando data da última partida...")
+            for tarefa in asyncio.as_completed([
+                buscar_data_partida(cliente, nick, player_last_match[nick])
+                for nick in alterados if nick in player_last_match
+            ]):
+                nick, data = await tarefa
+                player_updated_at[nick] = data
+                if data is None:
+                    # Sem a data, o estado não guarda a partida: o próximo sync tenta de novo
+                    player_last_match.pop(nick)
+                    print(f"⚠️ {nick} | data da última partida indisponível")
+                    continue
+                print(f"📅 {nick} | última partida: {data}")
+
+        with metricas().fase("stats", jogadores=len(alterados)):
+            print("⚡ Buscando estatísticas em paralelo...")
+            for tarefa in asyncio.as_completed([
+                buscar_stats(cliente, player, p_id, season_id, player_updated_at.get(player))
+                for player, p_id in alterados.items()
+            ]):
+                resultado, modos = await tarefa
+                linhas_modos.extend(modos)
+                if resultado is None:
+                    continue
+                if resultado[0] == "only_date":
+                    only_date_updates.append((resultado[2], resultado[1]))
+                else:
+                    resultados.append(resultado)
+
+    return resultados, only_date_updates, linhas_modos, player_last_match, inalterados, nao_encontrados
+
+def garantir_tabela_estado(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS importacao_estado (
+        nick TEXT PRIMARY KEY,
+        season_id TEXT,
+        match_id TEXT,
+        verificado_em TIMESTAMPTZ DEFAULT NOW()
+    )
+    """)
+
+def carregar_estado(cursor):
+    cursor.execute("SELECT nick, season_id, match_id FROM importacao_estado")
+    return {nick: (season_id, match_id) for nick, season_id, match_id in cursor.fetchall()}
+
+def salvar_estado(cursor, season_id, player_last_match, processados, inalterados):
+    execute_values(cursor, """
+    INSERT INTO importacao_estado (nick, season_id, match_id, verificado_em)
+    VALUES %s
     ON CONFLICT (nick) DO UPDATE SET
+    season_id=EXCLUDED.season_id,
+    match_id=EXCLUDED.match_id,
+    verificado_em=EXCLUDED.verificado_em
+    """, [(nick, season_id, player_last_match.get(nick)) for nick in processados],
+        template="(%s, %s, %s, NOW())")
+    # Marca os demais como verificados: é o sinal de "último sync" do dashboard
+    cursor.execute(
+        "UPDATE importacao_estado SET verificado_em = NOW() WHERE nick = ANY(%s)",
+        (list(inalterados),)
+    )
+
+def copiar_snapshot_inalterados(cursor, semana, nicks):
+    # Quem não jogou desde o último sync mantém a linha atual do ranking_squad
+    if not nicks:
+        return
+    cursor.execute("""
+    INSERT INTO ranking_semanal
+    (nick, semana, partidas, kr, vitorias, kills, dano_medio,
+     assists, headshots, revives, kill_dist_max, top10, atualizado_em)
+    SELECT nick, %s, partidas, kr, vitorias, kills, dano_medio,
+           assists, headshots, revives, kill_dist_max, top10, atualizado_em
+    FROM ranking_squad
+    WHERE nick = ANY(%s)
+    ON CONFLICT (nick, semana) DO NOTHING
+    """, (semana, list(nicks)))
+
+COLUNAS_STATS = [
+    "partidas", "kr", "vitorias", "kills", "dano_medio",
+    "assists", "headshots", "revives", "kill_dist_max", "top10"
+]
+COLUNAS_SQUAD = ["nick"] + COLUNAS_STATS + ["atualizado_em", "updated_at"]
+COLUNAS_MODOS = ["nick", "season_id", "modo"] + COLUNAS_STATS + ["bruto", "atualizado_em"]
+
+def garantir_tabela_modos(cursor):
+    # Uma linha por jogador, temporada e modo de jogo (gameModeStats)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stats_modos (
+        nick TEXT NOT NULL,
+        season_id TEXT NOT NULL,
+        modo TEXT NOT NULL,
+        partidas INT,
+        kr DOUBLE PRECISION,
+        vitorias INT,
+        kills INT,
+        dano_medio INT,
+        assists INT,
+        headshots INT,
+        revives INT,
+        kill_dist_max DOUBLE PRECISION,
+        top10 INT,
+        bruto JSONB,
+        atualizado_em TIMESTAMP,
+        PRIMARY KEY (nick, season_id, modo)
+    )
+    """)
+
+def mesclar_semanal(cursor, semana):
+    # Lê da staging do ranking_squad carregada no mesmo commit
+    colunas = ", ".join(COLUNAS_STATS)
+    cursor.execute(f"""
+    INSERT INTO ranking_semanal (nick, semana, {colunas}, atualizado_em)
+    SELECT nick, %s, {colunas}, atualizado_em FROM stg_ranking_squad
+    ON CONFLICT (nick, semana) DO UPDATE SET
     partidas=EXCLUDED.partidas,
     kr=EXCLUDED.kr,
     vitorias=EXCLUDED.vitorias,
@@ -184,48 +267,32 @@ try:
     revives=EXCLUDED.revives,
     kill_dist_max=EXCLUDED.kill_dist_max,
     top10=EXCLUDED.top10,
-    atualizado_em = CASE
-        WHEN EXCLUDED.partidas > 0 THEN EXCLUDED.atualizado_em
-        ELSE ranking_squad.atualizado_em
-    END,
-    updated_at = CASE
-        WHEN EXCLUDED.updated_at IS NOT NULL 
-        THEN EXCLUDED.updated_at
-        ELSE ranking_squad.updated_at
-    END
-    """
-    cursor.executemany(sql, resultados)
-
-    # Atualiza only_date — apenas updated_at, sem tocar no atualizado_em
-    if only_date_updates:
-        for updated_at, nick in only_date_updates:
-            cursor.execute(
-                "UPDATE ranking_squad SET updated_at = %s, atualizado_em = atualizado_em WHERE nick = %s AND updated_at IS NULL",
-                (updated_at, nick)
-            )
-            print(f"📅 updated_at atualizado para {nick}: {updated_at}")
-
-    # ===============================
-    # SNAPSHOT SEMANAL
-    # ===============================
-    semana_atual = get_segunda_feira()
-    semana_anterior = semana_atual - timedelta(weeks=1)
-    print(f"📊 Salvando snapshot semanal para semana de {semana_atual}...")
+    atualizado_em=EXCLUDED.atualizado_em
+    WHERE {linha_distinta("ranking_semanal", COLUNAS_STATS)}
+    """, (semana,))
 
+def primeiro_sync_da_semana(cursor):
     cursor.execute(
         "SELECT COUNT(*) FROM ranking_semanal WHERE semana = %s",
-        (semana_atual,)
+        (get_segunda_feira(),)
     )
-    ja_existe_semana_atual = cursor.fetchone()[0] > 0
-
-    if not ja_existe_semana_atual:
-        print(f"🔄 Primeiro sync da semana. Atualizando snapshot de {semana_anterior}...")
-        sql_atualiza_anterior = """
-        INSERT INTO ranking_semanal
-        (nick, semana, partidas, kr, vitorias, kills, dano_medio,
-         assists, headshots, revives, kill_dist_max, top10, atualizado_em)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (nick, semana) DO UPDATE SET
+    return cursor.fetchone()[0] == 0
+
+def gravar_coleta(cursor, season_id, resultados, only_date_updates, linhas_modos, player_last_match,
+                  inalterados, nao_encontrados, primeiro_da_semana):
+    """Grava o resultado de coletar_dados na transação atual, sem commitar."""
+    # ===============================
+    # UPDATE RANKING_SQUAD
+    # ===============================
+    # Um COPY para a staging e um merge; linhas sem mudança não geram escrita
+    with metricas().fase("upsert_ranking_squad", linhas=len(resultados)):
+        copiar_para_staging(cursor, "stg_ranking_squad", "ranking_squad", COLUNAS_SQUAD, resultados)
+
+        stats_mudaram = linha_distinta("ranking_squad", COLUNAS_STATS)
+        cursor.execute(f"""
+        INSERT INTO ranking_squad ({", ".join(COLUNAS_SQUAD)})
+        SELECT {", ".join(COLUNAS_SQUAD)} FROM stg_ranking_squad
+        ON CONFLICT (nick) DO UPDATE SET
         partidas=EXCLUDED.partidas,
         kr=EXCLUDED.kr,
         vitorias=EXCLUDED.vitorias,
@@ -236,51 +303,235 @@ try:
         revives=EXCLUDED.revives,
         kill_dist_max=EXCLUDED.kill_dist_max,
         top10=EXCLUDED.top10,
-        atualizado_em=EXCLUDED.atualizado_em
-        """
-        resultados_anterior = [
-            (r[0], semana_anterior, r[1], r[2], r[3], r[4],
-             r[5], r[6], r[7], r[8], r[9], r[10], r[11])
-            for r in resultados
-        ]
-        cursor.executemany(sql_atualiza_anterior, resultados_anterior)
-        print(f"✅ Snapshot de {semana_anterior} atualizado como âncora.")
-
-    sql_semanal = """
-    INSERT INTO ranking_semanal
-    (nick, semana, partidas, kr, vitorias, kills, dano_medio,
-     assists, headshots, revives, kill_dist_max, top10, atualizado_em)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    ON CONFLICT (nick, semana) DO UPDATE SET
-    partidas=EXCLUDED.partidas,
-    kr=EXCLUDED.kr,
-    vitorias=EXCLUDED.vitorias,
-    kills=EXCLUDED.kills,
-    dano_medio=EXCLUDED.dano_medio,
-    assists=EXCLUDED.assists,
-    headshots=EXCLUDED.headshots,
-    revives=EXCLUDED.revives,
-    kill_dist_max=EXCLUDED.kill_dist_max,
-    top10=EXCLUDED.top10,
-    atualizado_em=EXCLUDED.atualizado_em
+        atualizado_em = CASE
+            WHEN EXCLUDED.partidas > 0 AND {stats_mudaram} THEN EXCLUDED.atualizado_em
+            ELSE ranking_squad.atualizado_em
+        END,
+        updated_at = CASE
+            WHEN EXCLUDED.updated_at IS NOT NULL
+            THEN EXCLUDED.updated_at
+            ELSE ranking_squad.updated_at
+        END
+        WHERE {stats_mudaram}
+           OR (EXCLUDED.updated_at IS NOT NULL AND EXCLUDED.updated_at IS DISTINCT FROM ranking_squad.updated_at)
+        """)
+        print(f"💾 ranking_squad: {cursor.rowcount} linha(s) alterada(s) de {len(resultados)}")
+
+    # Stats de todos os modos (solo, duo, squad e FPP) da mesma resposta
+    with metricas().fase("upsert_stats_modos", linhas=len(linhas_modos)):
+        copiar_para_staging(cursor, "stg_stats_modos", "stats_modos", COLUNAS_MODOS, linhas_modos)
+        cursor.execute(f"""
+        INSERT INTO stats_modos ({", ".join(COLUNAS_MODOS)})
+        SELECT {", ".join(COLUNAS_MODOS)} FROM stg_stats_modos
+        ON CONFLICT (nick, season_id, modo) DO UPDATE SET
+        {", ".join(f"{c}=EXCLUDED.{c}" for c in COLUNAS_STATS + ["bruto", "atualizado_em"])}
+        WHERE {linha_distinta("stats_modos", COLUNAS_STATS)}
+        """)
+        print(f"💾 stats_modos: {cursor.rowcount} linha(s) alterada(s) de {len(linhas_modos)}")
+
+    # Atualiza only_date — apenas updated_at, sem tocar no atualizado_em
+    with metricas().fase("only_date", linhas=len(only_date_updates)):
+        if only_date_updates:
+            execute_values(cursor, """
+            UPDATE ranking_squad AS r SET updated_at = v.updated_at
+            FROM (VALUES %s) AS v(updated_at, nick)
+            WHERE r.nick = v.nick AND r.updated_at IS NULL
+            """, only_date_updates, template="(%s::timestamp, %s)")
+            print(f"📅 updated_at atualizado para {cursor.rowcount} jogador(es)")
+
+    # ===============================
+    # SNAPSHOT SEMANAL
+    # ===============================
+    with metricas().fase("snapshot_semanal"):
+        semana_atual = get_segunda_feira()
+        semana_anterior = semana_atual - timedelta(weeks=1)
+        print(f"📊 Salvando snapshot semanal para semana de {semana_atual}...")
+
+        if primeiro_da_semana:
+            print(f"🔄 Primeiro sync da semana. Atualizando snapshot de {semana_anterior}...")
+            mesclar_semanal(cursor, semana_anterior)
+            copiar_snapshot_inalterados(cursor, semana_anterior, inalterados)
+            print(f"✅ Snapshot de {semana_anterior} atualizado como âncora.")
+
+        mesclar_semanal(cursor, semana_atual)
+        copiar_snapshot_inalterados(cursor, semana_atual, inalterados)
+
+    with metricas().fase("estado"):
+        processados = [r[0] for r in resultados] + [nick for _, nick in only_date_updates]
+        salvar_estado(cursor, season_id, player_last_match, processados, inalterados)
+        marcar_para_resolver(cursor, nao_encontrados)
+
+TIPO_JOB = "pubg_import"
+
+def criar_lote(cursor, lote, jogadores, season_id):
+    """Um job por jogador do cadastro. Temporada e âncora semanal ficam fixas no lote."""
+    dados = {"temporada": season_id, "primeiro_da_semana": primeiro_sync_da_semana(cursor)}
+    if reservar_lote(cursor, TIPO_JOB, lote, dados):
+        enfileirar(cursor, TIPO_JOB, lote, [
+            (nick, {"account_id": account_id}) for nick, account_id in jogadores.items()
+        ])
+        print(f"📥 Lote {lote}: {len(jogadores)} job(s) criados")
+
+async def trabalhar(conn, cursor, lote, estado, completo=False):
+    """Modo worker: reivindica jogadores do lote, LOTE_API por vez, até a fila esvaziar.
+
+    Cada grupo é gravado e marcado como feito no mesmo commit; se o worker
+    cair no meio, o lease vence e outro worker refaz o grupo (os upserts são
+    idempotentes).
     """
+    dados_lote = ler_lote(cursor, TIPO_JOB, lote)
+    season_id = dados_lote["temporada"]
+    worker = nome_worker()
+    conn_bucket = psycopg2.connect(DATABASE_URL)
+    bucket = TokenBucketBanco(conn_bucket)
+    feitos = 0
+    try:
+        while True:
+            jobs = reivindicar(conn, TIPO_JOB, lote, worker, LOTE_API)
+            if not jobs:
+                if await aguardar_leases(conn, TIPO_JOB, lote):
+                    continue
+                break
+            ids = [job_id for job_id, _, _ in jobs]
+            grupo = {nick: dados["account_id"] for _, nick, dados in jobs}
+            try:
+                with metricas().fase("job", jogadores=len(grupo)):
+                    coleta = await coletar_dados(grupo, season_id, estado, completo, bucket)
+                    gravar_coleta(cursor, season_id, *coleta, dados_lote["primeiro_da_semana"])
+                    concluir(cursor, ids)
+                    conn.commit()
+                feitos += len(ids)
+            except Exception as e:
+                conn.rollback()
+                print(f"💥 Erro no grupo {', '.join(grupo)}: {e}")
+                devolver(conn, ids, str(e))
+    finally:
+        bucket.fechar()
+        conn_bucket.close()
+    return feitos
+
+parser = argparse.ArgumentParser(description="Importa as estatísticas de squad da PUBG")
+parser.add_argument(
+    "--completo", action="store_true",
+    default=os.environ.get("PUBG_IMPORT_COMPLETO") == "1",
+    help="busca stats de todos os jogadores, mesmo sem partida nova"
+)
+parser.add_argument(
+    "--worker", action="store_true",
+    help="divide o cadastro com outros workers pela fila no banco (fila_jobs)"
+)
+parser.add_argument(
+    "--lote", default=lote_padrao(),
+    help="identificador da execução compartilhado pelos workers (padrão: GITHUB_RUN_ID)"
+)
+args = parser.parse_args()
 
-    resultados_semanal = [
-        (r[0], semana_atual, r[1], r[2], r[3], r[4],
-         r[5], r[6], r[7], r[8], r[9], r[10], r[11])
-        for r in resultados
-    ]
+inicio_total = time.time()
+m = iniciar_metricas("pubg_import")
 
-    cursor.executemany(sql_semanal, resultados_semanal)
+try:
+    conn = psycopg2.connect(DATABASE_URL)
+    cursor = conn.cursor()
+    # Workers convivem entre si (trava compartilhada), mas não com uma execução normal
+    if not tentar_trava(cursor, TRAVA_IMPORTACAO, compartilhada=args.worker):
+        print("⏭️ Outra importação já está em andamento. Saindo.")
+        conn.close()
+        raise SystemExit(0)
+    travar_esquema(cursor)
+    garantir_tabela_estado(cursor)
+    garantir_tabela_modos(cursor)
+    garantir_registro(cursor)
+    if args.worker:
+        garantir_fila(cursor)
+    conn.commit()
+    estado = carregar_estado(cursor)
+    # Não deixa a conexão parada dentro de uma transação durante as chamadas à API
     conn.commit()
 
-    cursor.close()
-    conn.close()
-
-    print("💾 Banco atualizado com sucesso!")
+    # Só nicks novos ou alterados no cadastro passam pela busca por nome
+    with m.fase("cadastro"):
+        registro = resolver_pendentes(cursor, carregar_registro(cursor), cliente_padrao().get_json)
+        jogadores = {nick: account_id for nick, account_id in registro.items() if account_id}
 
-except Exception as e:
+    print("🚀 Detectando temporada...")
+    with m.fase("temporada"):
+        current_season_id = temporada_atual(cursor, cliente_padrao().get_json)
+    conn.commit()
+except psycopg2.Error as e:
     print(f"💥 Erro no banco: {e}")
+    raise SystemExit(1)
+
+print(f"📅 Temporada atual: {current_season_id}")
+
+if args.worker:
+    totais = {"lote": args.lote, "feitos": 0}
+    try:
+        # O primeiro worker cria os jobs; os demais esperam o commit dele no INSERT do lote
+        with m.fase("lote"):
+            criar_lote(cursor, args.lote, jogadores, current_season_id)
+            conn.commit()
+
+        with m.fase("coleta", completo=args.completo, lote=args.lote):
+            totais["feitos"] = asyncio.run(trabalhar(conn, cursor, args.lote, estado, args.completo))
+        print(f"✅ {totais['feitos']} jogador(es) processados por este worker.")
+
+        # Só o worker que fecha o lote recalcula o ranking
+        if finalizar_lote(cursor, TIPO_JOB, args.lote):
+            print(f"🏁 Lote {args.lote} concluído ({resumo_lote(contar_jobs(cursor, TIPO_JOB, args.lote))})")
+            with m.fase("ranking_materializado"):
+                atualizar_ranking_materializado(conn)
+        else:
+            conn.rollback()
+
+        cursor.close()
+        conn.close()
+
+    except Exception as e:
+        print(f"💥 Erro no banco: {e}")
+
+else:
+    with m.fase("coleta", completo=args.completo):
+        resultados, only_date_updates, linhas_modos, player_last_match, inalterados, nao_encontrados = asyncio.run(
+            coletar_dados(jogadores, current_season_id, estado, args.completo)
+        )
+
+    print(f"✅ {len(resultados)} jogadores com stats válidas.")
+    if only_date_updates:
+        print(f"📅 {len(only_date_updates)} jogador(es) com apenas updated_at para atualizar.")
+
+    totais = {
+        "com_stats": len(resultados),
+        "linhas_modos": len(linhas_modos),
+        "apenas_data": len(only_date_updates),
+        "inalterados": len(inalterados),
+    }
+
+    try:
+        gravar_coleta(
+            cursor, current_season_id, resultados, only_date_updates, linhas_modos, player_last_match,
+            inalterados, nao_encontrados, primeiro_sync_da_semana(cursor)
+        )
+        with m.fase("commit"):
+            conn.commit()
+
+        # Ranking final recalculado no banco a partir dos dados recém-gravados
+        with m.fase("ranking_materializado"):
+            atualizar_ranking_materializado(conn)
+
+        cursor.close()
+        conn.close()
+
+        print("💾 Banco atualizado com sucesso!")
+
+    except Exception as e:
+        print(f"💥 Erro no banco: {e}")
 
 fim_total = time.time()
 print(f"⏱ Tempo total: {round(fim_total - inicio_total, 2)} segundos")
+
+m.gravar(
+    DATABASE_URL,
+    temporada=current_season_id,
+    jogadores=len(jogadores),
+    **totais,
+)
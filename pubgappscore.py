@@ -1,9 +1,26 @@
 # pubgappscore.py
 import streamlit as st
 import pandas as pd
+import cProfile
+import io
+import json
+import os
+import pstats
 import subprocess
 import sys
+import threading
 import plotly.express as px
+from metricas import Metricas
+from ranking_calculos import (
+    PainelSemanal, deduzir_bots, estilizar_ranking, limpar_nicks,
+    normalizar_numericos, processar_ranking_completo
+)
+from ranking_consultas import (
+    CONSULTAS, INICIO_SEMANAS_TEMPORADA, MODO_PADRAO, SQL_CALCULADO_EM, SQL_MODOS,
+    SQL_VERIFICADO_EM, SQL_VERSAO, ler_dados, ler_ranking_modo, montar_versao
+)
+from ranking_formulas import FORMULAS
+from ranking_pontuacao import calcular_scores, descrever_formula
 from datetime import datetime, timedelta, timezone
 
 MESES_PT = {
@@ -17,23 +34,69 @@ MESES_PT = {
 # ===============================
 MINUTOS_PARA_ATUALIZAR = 2  # 👈 Altere aqui o intervalo de atualização
 
+# Por quanto tempo o carimbo de versão dos dados é reaproveitado entre reruns
+SEGUNDOS_CACHE_VERSAO = 10
+
+ROTULOS_MODOS = {
+    "squad": "👥 Squad TPP", "squad-fpp": "👥 Squad FPP",
+    "duo": "👫 Duo TPP", "duo-fpp": "👫 Duo FPP",
+    "solo": "👤 Solo TPP", "solo-fpp": "👤 Solo FPP",
+}
+
+
+@st.cache_resource
+def estado_atualizacao():
+    # Compartilhado por todas as sessões do processo: no máximo um import por vez
+    return {"trava": threading.Lock(), "inicio": None, "erro": None}
+
+
+def rodar_importacao(estado):
+    try:
+        resultado = subprocess.run([sys.executable, "pubg_import.py"])
+        estado["erro"] = None if resultado.returncode == 0 else f"código de saída {resultado.returncode}"
+    except Exception as e:
+        estado["erro"] = str(e)
+    finally:
+        estado["inicio"] = None
+        estado["trava"].release()
+
+
+def disparar_atualizacao():
+    """Inicia o import em segundo plano, se nenhum estiver rodando.
+
+    Entre processos (outras réplicas ou o cron), pubg_import.py se protege
+    com um advisory lock no Postgres e sai se já houver um em andamento.
+    """
+    estado = estado_atualizacao()
+    if not estado["trava"].acquire(blocking=False):
+        return False
+    estado["inicio"] = datetime.now(timezone.utc)
+    threading.Thread(target=rodar_importacao, args=(estado,), daemon=True).start()
+    return True
+
 
 def checar_e_atualizar():
     try:
-        conn = st.connection(
-            "postgresql",
-            type="sql",
-            url=st.secrets["DATABASE_URL"]
-        )
+        conn = conexao()
+        # O importador incremental não reescreve quem não jogou; o último sync
+        # fica registrado em importacao_estado.verificado_em, que só existe depois
+        # do primeiro import (sem ela, o dashboard precisa poder disparar esse import)
         resultado = conn.query(
-            "SELECT MAX(atualizado_em) AS ultima FROM ranking_squad",
+            """
+            SELECT MAX(atualizado_em) AS ultima,
+                   to_regclass('importacao_estado') IS NOT NULL AS tem_estado
+            FROM ranking_squad
+            """,
             ttl=0
         )
-        ultima = resultado["ultima"].iloc[0]
+        datas = [resultado["ultima"].iloc[0]]
+        if bool(resultado["tem_estado"].iloc[0]):
+            datas.append(conn.query(SQL_VERIFICADO_EM, ttl=0)["verificado_em"].iloc[0])
+        datas = [pd.Timestamp(d) for d in datas if not pd.isna(d)]
+        datas = [d.tz_localize("UTC") if d.tzinfo is None else d for d in datas]
+        ultima = max(datas, default=None)
 
         if ultima is not None:
-            if ultima.tzinfo is None:
-                ultima = ultima.replace(tzinfo=timezone.utc)
             agora = datetime.now(timezone.utc)
             diferenca = agora - ultima
             precisa_atualizar = diferenca > timedelta(minutes=MINUTOS_PARA_ATUALIZAR)
@@ -41,15 +104,18 @@ def checar_e_atualizar():
             precisa_atualizar = True
 
         if precisa_atualizar:
-            with st.spinner("⏳ Atualizando dados do ranking..."):
-                subprocess.run([sys.executable, "pubg_import.py"], check=True)
+            disparar_atualizacao()
+
+        estado = estado_atualizacao()
+        if estado["inicio"] is not None:
+            st.caption("🔄 Atualizando dados do ranking em segundo plano...")
+        elif estado["erro"]:
+            st.caption(f"⚠️ Última atualização falhou: {estado['erro']}")
 
     except Exception as e:
         st.warning(f"Erro ao verificar atualização: {e}")
 
 
-checar_e_atualizar()
-
 st.set_page_config(
     page_title="PUBG Squad Ranking",
     layout="wide",
@@ -57,6 +123,47 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
+# ===============================
+# ⏱ PERFIL DAS ETAPAS
+# ===============================
+# ?perfil=1 (ou PUBG_DASHBOARD_PERFIL=1) mostra o tempo de cada etapa deste rerun;
+# ?perfil=cprofile captura também um cProfile deste rerun (a URL volta para ?perfil=1)
+MODO_PERFIL = st.query_params.get("perfil") or os.environ.get("PUBG_DASHBOARD_PERFIL", "")
+perf = Metricas("dashboard")
+perfilador = None
+if MODO_PERFIL == "cprofile":
+    perfilador = cProfile.Profile()
+    perfilador.enable()
+    st.query_params["perfil"] = "1"
+
+
+def mostrar_perfil(**extra):
+    if MODO_PERFIL in ("", "0"):
+        return
+    if perfilador is not None:
+        perfilador.disable()
+
+    registro = perf.registro(**extra)
+    # Uma linha JSON por rerun nos logs do Streamlit
+    print(json.dumps({"perfil_dashboard": registro}, ensure_ascii=False, default=str))
+
+    with st.expander(f"⏱️ Perfil desta execução ({registro['duracao_s'] * 1000:.0f} ms)"):
+        fases = pd.DataFrame([
+            {
+                "etapa": f["nome"],
+                "dentro de": f.get("pai", ""),
+                "detalhe": ", ".join(f"{k}={v}" for k, v in f.get("atributos", {}).items()),
+                "ms": round(f["duracao_s"] * 1000, 1),
+            }
+            for f in registro["fases"]
+        ])
+        st.dataframe(fases, use_container_width=True, hide_index=True)
+
+        if perfilador is not None:
+            saida = io.StringIO()
+            pstats.Stats(perfilador, stream=saida).sort_stats("cumulative").print_stats(40)
+            st.code(saida.getvalue())
+
 st.markdown("""
 <style>
 .stApp {
@@ -83,386 +190,274 @@ div[data-testid="stTabs"] button{
 </style>
 """, unsafe_allow_html=True)
 
-def get_data(table_name="v_ranking_squad_completo"):
-    try:
-        conn = st.connection(
-            "postgresql",
-            type="sql",
-            url=st.secrets["DATABASE_URL"]
-        )
-        query = f"SELECT * FROM {table_name}"
-        df = conn.query(query, ttl=0)
-        return df
-    except Exception as e:
-        st.error(f"Erro na conexão com o banco: {e}")
-        return pd.DataFrame()
+def conexao():
+    return st.connection(
+        "postgresql",
+        type="sql",
+        url=st.secrets["DATABASE_URL"]
+    )
 
-def get_data_semanal():
+def versao_dados():
+    """Carimbo barato da versão dos dados: só muda quando um import grava algo."""
+    df_versao = conexao().query(SQL_VERSAO, ttl=SEGUNDOS_CACHE_VERSAO)
+    df_calculado = df_verificado = None
+    if bool(df_versao["materializado"].iloc[0]):
+        df_calculado = conexao().query(SQL_CALCULADO_EM, ttl=SEGUNDOS_CACHE_VERSAO)
+    if bool(df_versao["tem_estado"].iloc[0]):
+        df_verificado = conexao().query(SQL_VERIFICADO_EM, ttl=SEGUNDOS_CACHE_VERSAO)
+    return montar_versao(df_versao, df_calculado, df_verificado)
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def carregar_dados(versao, inicio_semanas, materializado=False):
+    """As quatro consultas numa única conexão e transação (snapshot consistente).
+
+    `versao` só entra na chave do cache: mudou a versão, as consultas rodam de novo.
+    """
+    with conexao().engine.connect() as c:
+        return ler_dados(c, inicio_semanas, materializado)
+
+def modos_disponiveis():
+    """modo -> carimbo de versão dos modos em stats_modos (vazio antes do primeiro import)."""
     try:
-        conn = st.connection(
-            "postgresql",
-            type="sql",
-            url=st.secrets["DATABASE_URL"]
-        )
-        df = conn.query("SELECT * FROM ranking_semanal ORDER BY semana DESC", ttl=0)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao buscar dados semanais: {e}")
-        return pd.DataFrame()
+        df = conexao().query(SQL_MODOS, ttl=SEGUNDOS_CACHE_VERSAO)
+    except Exception:
+        return {}
+    return {linha.modo: str(linha.versao) for linha in df.itertuples()}
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def carregar_ranking_modo(versao, modo):
+    with conexao().engine.connect() as c:
+        return ler_ranking_modo(c, modo)
 
-def get_data_bot_semanal():
+def get_dados_dashboard():
     try:
-        conn = st.connection(
-            "postgresql",
-            type="sql",
-            url=st.secrets["DATABASE_URL"]
-        )
-        df = conn.query("SELECT * FROM ranking_bot_semanal ORDER BY semana DESC", ttl=0)
-        return df
+        with perf.fase("versao_dados"):
+            versao, materializado = versao_dados()
+        with perf.fase("consultas", materializado=materializado):
+            return versao, carregar_dados(versao, INICIO_SEMANAS_TEMPORADA, materializado)
     except Exception as e:
-        st.error(f"Erro ao buscar dados semanais do bot: {e}")
-        return pd.DataFrame()
-
-def processar_ranking_completo(df_ranking, col_score):
-    total = len(df_ranking)
-    novos_nicks = []
-    zonas = []
-    is_bot_ranking = col_score == "score"
-
-    df_ranking = df_ranking.sort_values(
-        by=col_score,
-        ascending=is_bot_ranking
-    ).reset_index(drop=True)
-
-    for i, row in df_ranking.iterrows():
-        pos = i + 1
-        nick_limpo = str(row["nick"])
-        for emoji in ["💀", "💩", "👤"]:
-            nick_limpo = nick_limpo.replace(emoji, "").strip()
-
-        if pos <= 3:
-            novos_nicks.append(f"💀 {nick_limpo}")
-            zonas.append("Elite Zone")
-        elif pos > (total - 3):
-            novos_nicks.append(f"💩 {nick_limpo}")
-            zonas.append("Cocô Zone")
-        else:
-            novos_nicks.append(f"👤 {nick_limpo}")
-            zonas.append("Medíocre Zone")
-
-    df_ranking["Pos"] = range(1, total + 1)
-    df_ranking["nick"] = novos_nicks
-    df_ranking["Classificação"] = zonas
-
-    cols_base = [
-        "Pos", "Classificação", "nick",
-        "partidas", "kr", "vitorias",
-        "kills", "assists", "headshots",
-        "revives", "kill_dist_max", "dano_medio", "top10"
-    ]
-    if col_score not in cols_base:
-        cols_base.append(col_score)
+        st.error(f"Erro na conexão com o banco: {e}")
+        return None, {nome: pd.DataFrame() for nome in CONSULTAS}
 
-    return df_ranking[cols_base]
+@st.cache_resource(show_spinner=False, max_entries=2)
+def get_painel_semanal(versao, _df_semanal, _df_bot_semanal):
+    # Um painel por versão dos dados; trocar de semana só fatia o array
+    return PainelSemanal.montar(_df_semanal, _df_bot_semanal)
 
 def grafico_horizontal(df, col, titulo, cor):
-    df_sorted = df.sort_values(col, ascending=True).copy()
-    fig = px.bar(
-        df_sorted,
-        x=col,
-        y="nick",
-        orientation="h",
-        title=titulo,
-        color_discrete_sequence=[cor]
-    )
-    fig.update_layout(
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-        font_color="white",
-        title_font_color="white",
-        xaxis=dict(showgrid=True, gridcolor="#2a2a2a"),
-        yaxis=dict(showgrid=False),
-        margin=dict(l=10, r=10, t=40, b=10),
-        height=500
-    )
-    st.plotly_chart(fig, use_container_width=True)
-
-def aplicar_deducoes_bot_semanal(df_local, df_bot_semanal, semana_atual, semana_anterior=None):
-    if df_bot_semanal.empty:
-        return df_local
-
-    df_bot_semanal["semana"] = pd.to_datetime(df_bot_semanal["semana"]).dt.tz_localize(None).dt.normalize()
-
-    bot_atual = df_bot_semanal[df_bot_semanal["semana"] == semana_atual].set_index("nick")
-
-    if semana_anterior is not None:
-        bot_anterior = df_bot_semanal[df_bot_semanal["semana"] == semana_anterior].set_index("nick")
-    else:
-        bot_anterior = pd.DataFrame()
-
-    for nick in df_local["nick"].values:
-        if nick not in bot_atual.index:
-            continue
-        for col in ["partidas", "vitorias", "kills", "assists", "headshots", "revives", "top10"]:
-            if col not in df_local.columns:
-                continue
-            v_bot_atual = abs(bot_atual.loc[nick, col]) if nick in bot_atual.index else 0
-            v_bot_anterior = abs(bot_anterior.loc[nick, col]) if nick in bot_anterior.index else 0
-            delta_bot = max(0, v_bot_atual - v_bot_anterior)
-            v_total = df_local.loc[df_local["nick"] == nick, col].values[0]
-            df_local.loc[df_local["nick"] == nick, col] = max(0, v_total - delta_bot)
-
-    return df_local
-
-st.markdown(
-    "<h1 style='text-align:left;'>🏆 PUBG Ranking Squad - Season 41</h1>",
-    unsafe_allow_html=True
-)
+    with perf.fase("grafico", coluna=col):
+        df_sorted = df.sort_values(col, ascending=True).copy()
+        fig = px.bar(
+            df_sorted,
+            x=col,
+            y="nick",
+            orientation="h",
+            title=titulo,
+            color_discrete_sequence=[cor]
+        )
+        fig.update_layout(
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="rgba(0,0,0,0)",
+            font_color="white",
+            title_font_color="white",
+            xaxis=dict(showgrid=True, gridcolor="#2a2a2a"),
+            yaxis=dict(showgrid=False),
+            margin=dict(l=10, r=10, t=40, b=10),
+            height=500
+        )
+        st.plotly_chart(fig, use_container_width=True)
 
-df_bruto = get_data("v_ranking_squad_completo")
-df_bots_raw = get_data("ranking_bot")
-df_semanal = get_data_semanal()
-df_bot_semanal = get_data_bot_semanal()
+def renderizar_pagina():
+    """Corpo da página; retorna (versao, modo) para o perfil da execução."""
+    st.markdown(
+        "<h1 style='text-align:left;'>🏆 PUBG Ranking Squad - Season 41</h1>",
+        unsafe_allow_html=True
+    )
 
-if not df_bruto.empty:
-    if "ultima_atualizacao" in df_bruto.columns:
-        try:
-            dt_raw = pd.to_datetime(df_bruto["ultima_atualizacao"].iloc[0])
-            dt_formatada = dt_raw.strftime("%d/%m/%Y %H:%M")
-            st.markdown(
-                f"<p style='text-align:left;color:#888;margin-top:-15px;'>📅 Última atualização do banco: <b>{dt_formatada}</b></p>",
-                unsafe_allow_html=True
-            )
-        except:
-            pass
-
-    st.markdown("---")
-
-    cols_calc = [
-        "partidas", "vitorias", "kills",
-        "assists", "headshots", "revives", "dano_medio", "top10"
-    ]
-
-    for col in cols_calc:
-        df_bruto[col] = pd.to_numeric(df_bruto[col], errors="coerce").fillna(0)
-        if not df_bots_raw.empty and col in df_bots_raw.columns:
-            df_bots_raw[col] = pd.to_numeric(df_bots_raw[col], errors="coerce").fillna(0)
-
-    if not df_bots_raw.empty:
-        for _, row_bot in df_bots_raw.iterrows():
-            nick_bot = row_bot["nick"]
-            if nick_bot in df_bruto["nick"].values:
-                for col in ["partidas", "vitorias", "kills", "assists", "headshots", "revives", "top10"]:
-                    v_total = df_bruto.loc[df_bruto["nick"] == nick_bot, col].values[0]
-                    v_casual = abs(row_bot[col])
-                    df_bruto.loc[df_bruto["nick"] == nick_bot, col] = max(0, v_total - v_casual)
-
-                p_limpas = max(1, df_bruto.loc[df_bruto["nick"] == nick_bot, "partidas"].values[0])
-                k_limpas = df_bruto.loc[df_bruto["nick"] == nick_bot, "kills"].values[0]
-                df_bruto.loc[df_bruto["nick"] == nick_bot, "kr"] = k_limpas / p_limpas
-
-    for col in cols_calc:
-        df_bruto[col] = df_bruto[col].astype(int)
-
-    def highlight_zones(row):
-        if row["Classificação"] == "Elite Zone":
-            return ["background-color:#003300;color:white;font-weight:bold"] * len(row)
-        if row["Classificação"] == "Cocô Zone":
-            return ['background-color: #5A3E1B; color: white; font-weight: bold'] * len(row)
-        return [""] * len(row)
-
-    def aplicar_decaimento(df_local, col_score):
-        hoje = pd.Timestamp.utcnow()
-        df_local["updated_at"] = pd.to_datetime(df_local["updated_at"], errors="coerce").dt.tz_localize("UTC")
-        df_local["atualizado_em"] = pd.to_datetime(df_local["atualizado_em"], utc=True, errors="coerce")
-        df_local["data_referencia"] = df_local["updated_at"].fillna(df_local["atualizado_em"])
-        df_local["data_referencia"] = df_local["data_referencia"].fillna(
-            pd.Timestamp("2000-01-01", tz="UTC")
+    with perf.fase("checar_e_atualizar"):
+        checar_e_atualizar()
+
+    # Outros modos saem da mesma resposta de stats que o squad: nenhuma requisição a mais
+    with perf.fase("modos"):
+        versoes_modos = modos_disponiveis()
+    opcoes_modos = [MODO_PADRAO] + sorted(m for m in versoes_modos if m != MODO_PADRAO)
+    modo = MODO_PADRAO
+    if len(opcoes_modos) > 1:
+        modo = st.radio(
+            "Modo de jogo:",
+            options=opcoes_modos,
+            format_func=lambda m: ROTULOS_MODOS.get(m, m),
+            horizontal=True,
+            key="modo_jogo"
         )
-        df_local["dias_inativo"] = (hoje - df_local["data_referencia"]).dt.days.fillna(0)
-        df_local["semanas_inativo"] = (df_local["dias_inativo"] // 7).astype(int)
-        df_local[col_score] = df_local[col_score] * (0.85 ** df_local["semanas_inativo"])
-        return df_local
-
-    def renderizar_ranking(df_local, col_score, formula, explicacao, calculo_discreto=""):
-        if formula is not None:
-            df_local[col_score] = formula.round(2)
-            if col_score != "score":
-                df_local = aplicar_decaimento(df_local, col_score)
-
-        ranking_final = processar_ranking_completo(df_local, col_score)
-        top1, top2, top3 = st.columns(3)
-
-        with top1:
-            nome = ranking_final.iloc[0]["nick"] if len(ranking_final) > 0 else "-"
-            valor = f"{ranking_final.iloc[0][col_score]:.2f} pts" if len(ranking_final) > 0 else "0.00 pts"
-            st.metric("🥇 1º Lugar", nome, valor)
-        with top2:
-            nome = ranking_final.iloc[1]["nick"] if len(ranking_final) > 1 else "-"
-            valor = f"{ranking_final.iloc[1][col_score]:.2f} pts" if len(ranking_final) > 1 else "0.00 pts"
-            st.metric("🥈 2º Lugar", nome, valor)
-        with top3:
-            nome = ranking_final.iloc[2]["nick"] if len(ranking_final) > 2 else "-"
-            valor = f"{ranking_final.iloc[2][col_score]:.2f} pts" if len(ranking_final) > 2 else "0.00 pts"
-            st.metric("🥉 3º Lugar", nome, valor)
+    outro_modo = modo != MODO_PADRAO
+
+    with perf.fase("carregar_dados"):
+        versao, dados = get_dados_dashboard()
+        if outro_modo:
+            # Sem anti-casual nem histórico semanal: o anti-casual só avalia partidas de squad
+            with perf.fase("consulta_modo", modo=modo):
+                try:
+                    dados["ranking"] = carregar_ranking_modo(versoes_modos[modo], modo)
+                except Exception as e:
+                    st.error(f"Erro ao carregar o modo {modo}: {e}")
+                    dados["ranking"] = pd.DataFrame()
+            dados["bots"] = pd.DataFrame()
+    df_bruto = dados["ranking"]
+    df_bots_raw = dados["bots"]
+    df_semanal = dados["semanal"]
+    df_bot_semanal = dados["bot_semanal"]
+
+    if not df_bruto.empty:
+        if "ultima_atualizacao" in df_bruto.columns:
+            try:
+                dt_raw = pd.to_datetime(df_bruto["ultima_atualizacao"].iloc[0])
+                dt_formatada = dt_raw.strftime("%d/%m/%Y %H:%M")
+                st.markdown(
+                    f"<p style='text-align:left;color:#888;margin-top:-15px;'>📅 Última atualização do banco: <b>{dt_formatada}</b></p>",
+                    unsafe_allow_html=True
+                )
+            except:
+                pass
 
-        st.markdown(
-            f"<div style='background-color:#161b22;padding:12px;border-radius:8px;border-left:5px solid #0078ff;margin-bottom:20px;text-align:left;'>💡 {explicacao}</div>",
-            unsafe_allow_html=True
-        )
-        if calculo_discreto:
-            st.caption(f"⚙️ Cálculo: {calculo_discreto} | ⚠️ Penalidade: -15% a cada 7 dias de inatividade.")
-
-        if col_score == "score":
-            format_dict = {
-                "kr": lambda x: f"- {abs(x):.2f}",
-                "kill_dist_max": lambda x: f"- {abs(x):.2f}",
-                "partidas": lambda x: f"- {int(abs(x))}",
-                "vitorias": lambda x: f"- {int(abs(x))}",
-                "kills": lambda x: f"- {int(abs(x))}",
-                "assists": lambda x: f"- {int(abs(x))}",
-                "headshots": lambda x: f"- {int(abs(x))}",
-                "revives": lambda x: f"- {int(abs(x))}",
-                "dano_medio": lambda x: f"- {int(abs(x))}",
-                "top10": lambda x: f"- {int(abs(x))}",
-                col_score: "{:.2f}"
-            }
-        else:
-            format_dict = {
-                "kr": "{:.2f}",
-                "kill_dist_max": "{:.2f}",
-                col_score: "{:.2f}",
-                "partidas": "{:d}",
-                "vitorias": "{:d}",
-                "kills": "{:d}",
-                "assists": "{:d}",
-                "headshots": "{:d}",
-                "revives": "{:d}",
-                "dano_medio": "{:d}",
-                "top10": "{:d}"
-            }
+        st.markdown("---")
 
-        st.dataframe(
-            ranking_final.style
-            .background_gradient(cmap='YlGnBu' if col_score != 'score' else 'RdYlGn', subset=[col_score])
-            .apply(highlight_zones, axis=1)
-            .format(format_dict),
-            use_container_width=True,
-            height=(len(ranking_final) * 35) + 80,
-            hide_index=True,
-            column_config={
-                "nick": "Nickname",
-                "partidas": "Partidas",
-                "kr": "K/R",
-                "vitorias": "Vitórias",
-                "kills": "Kills",
-                "assists": "Assists",
-                "headshots": "Headshots",
-                "revives": "Revives",
-                "kill_dist_max": "Kill Dist Máx",
-                "dano_medio": "Dano Médio",
-                "top10": "Top 10",
-                "Score_Pro": "Score Pro",
-                "Score_Team": "Score Team",
-                "Score_Elite": "Score Elite",
-                "score": "Penalidade"
-            }
-        )
+        cols_calc = [
+            "partidas", "vitorias", "kills",
+            "assists", "headshots", "revives", "dano_medio", "top10"
+        ]
 
-    tab1, tab2, tab3, tab4 = st.tabs([
-        "🔥 PRO Player",
-        "🤝 TEAM Player",
-        "🎯 Atirador de Elite",
-        "🤖 Bot Detector"
-    ])
-
-    df_valid = df_bruto[df_bruto["partidas"] > 0].copy()
-    df_valid["partidas_calc"] = df_valid["partidas"].replace(0, 1)
-
-    with tab1:
-        f_pro = (
-            (df_valid["vitorias"] / df_valid["partidas_calc"] * 5) +
-            (df_valid["kills"] / df_valid["partidas_calc"] * 0.5) +
-            (df_valid["assists"] / df_valid["partidas_calc"] * 0.1) +
-            (df_valid["headshots"] / df_valid["partidas_calc"] * 0.2) +
-            (df_valid["revives"] / df_valid["partidas_calc"] * 0.33) +
-            (df_valid["top10"] / df_valid["partidas_calc"] * 0.1) +
-            (df_valid["dano_medio"] * 0.001)
-        )
-        renderizar_ranking(
-            df_valid.copy(),
-            "Score_Pro",
-            f_pro,
-            "Fórmula PRO: Equilíbrio entre sobrevivência e agressividade. Valoriza consistência em vitórias, kills, precisão, suporte e dano.",
-            "(Win Rate: 5) | (Kills: 0.5) | (Assists: 0.1) | (Headshots: 0.2) | (Revives: 0.33) | (Top10: 0.1) | (Dano Médio: 0.001)"
-        )
+        with perf.fase("normalizacao"):
+            df_bruto = normalizar_numericos(df_bruto, cols_calc)
+            if not df_bots_raw.empty:
+                df_bots_raw = normalizar_numericos(df_bots_raw, cols_calc)
 
-    with tab2:
-        f_team = (
-            (df_valid["vitorias"] / df_valid["partidas_calc"] * 8) +
-            (df_valid["revives"] / df_valid["partidas_calc"] * 5) +
-            (df_valid["assists"] / df_valid["partidas_calc"] * 3) +
-            (df_valid["top10"] / df_valid["partidas_calc"] * 2) +
-            (df_valid["dano_medio"] * 0.001)
-        )
-        renderizar_ranking(
-            df_valid.copy(),
-            "Score_Team",
-            f_team,
-            "Fórmula TEAM: Foco total em suporte e sobrevivência coletiva. Valoriza vitórias, revives, assists e top10 por partida.",
-            "(Win Rate: 8) | (Revives: 5) | (Assists: 3) | (Top10: 2) | (Dano Médio: 0.001)"
-        )
+        # Notas vindas da materialized view já têm o desconto do anti-casual
+        ja_calculado = all(nome in df_bruto.columns for nome in FORMULAS)
 
-    with tab3:
-        f_elite = (
-            (df_valid["kr"] * 15) +
-            (df_valid["headshots"] / df_valid["partidas_calc"] * 3) +
-            (df_valid["kill_dist_max"] * 0.05) +
-            (df_valid["dano_medio"] * 0.003) +
-            (df_valid["kills"] / df_valid["partidas_calc"] * 0.5)
-        )
-        renderizar_ranking(
-            df_valid.copy(),
-            "Score_Elite",
-            f_elite,
-            "Fórmula ELITE: Prioriza KR, precisão de headshots por partida, alcance máximo e volume de dano.",
-            "(KR: 15) | (Headshots: 3) | (Kill Dist Máx: 0.05) | (Dano Médio: 0.003) | (Kills: 0.5)"
-        )
+        # Desconta as stats de partidas casuais/com bots (ranking_bot)
+        if not ja_calculado:
+            with perf.fase("deducao_bots"):
+                df_bruto = deduzir_bots(df_bruto, df_bots_raw)
 
-    with tab4:
+        # Nick sem emojis de zona calculado uma vez; as abas só acrescentam o prefixo
+        df_bruto["nick_limpo"] = limpar_nicks(df_bruto["nick"])
         if not df_bots_raw.empty:
-            df_bots = df_bots_raw[df_bots_raw["partidas"] > 0].copy()
-            if not df_bots.empty:
-                renderizar_ranking(
-                    df_bots,
-                    "score",
-                    None,
-                    "Anti-Casual: Jogadores penalizados por matar bots em partidas no modo casual."
+            df_bots_raw["nick_limpo"] = limpar_nicks(df_bots_raw["nick"])
+
+        for col in cols_calc:
+            df_bruto[col] = df_bruto[col].astype(int)
+
+        def renderizar_ranking(df_local, col_score, explicacao, calculo_discreto=""):
+            with perf.fase("processar_ranking", score=col_score):
+                ranking_final = processar_ranking_completo(df_local, col_score)
+            top1, top2, top3 = st.columns(3)
+
+            with top1:
+                nome = ranking_final.iloc[0]["nick"] if len(ranking_final) > 0 else "-"
+                valor = f"{ranking_final.iloc[0][col_score]:.2f} pts" if len(ranking_final) > 0 else "0.00 pts"
+                st.metric("🥇 1º Lugar", nome, valor)
+            with top2:
+                nome = ranking_final.iloc[1]["nick"] if len(ranking_final) > 1 else "-"
+                valor = f"{ranking_final.iloc[1][col_score]:.2f} pts" if len(ranking_final) > 1 else "0.00 pts"
+                st.metric("🥈 2º Lugar", nome, valor)
+            with top3:
+                nome = ranking_final.iloc[2]["nick"] if len(ranking_final) > 2 else "-"
+                valor = f"{ranking_final.iloc[2][col_score]:.2f} pts" if len(ranking_final) > 2 else "0.00 pts"
+                st.metric("🥉 3º Lugar", nome, valor)
+
+            st.markdown(
+                f"<div style='background-color:#161b22;padding:12px;border-radius:8px;border-left:5px solid #0078ff;margin-bottom:20px;text-align:left;'>💡 {explicacao}</div>",
+                unsafe_allow_html=True
+            )
+            if calculo_discreto:
+                st.caption(f"⚙️ Cálculo: {calculo_discreto} | ⚠️ Penalidade: -15% a cada 7 dias de inatividade.")
+
+            # Styler (gradiente + cores por zona) é calculado dentro do st.dataframe
+            with perf.fase("tabela_styler", score=col_score, linhas=len(ranking_final)):
+                st.dataframe(
+                    estilizar_ranking(ranking_final, col_score),
+                    use_container_width=True,
+                    height=(len(ranking_final) * 35) + 80,
+                    hide_index=True,
+                    column_config={
+                        "nick": "Nickname",
+                        "partidas": "Partidas",
+                        "kr": "K/R",
+                        "vitorias": "Vitórias",
+                        "kills": "Kills",
+                        "assists": "Assists",
+                        "headshots": "Headshots",
+                        "revives": "Revives",
+                        "kill_dist_max": "Kill Dist Máx",
+                        "dano_medio": "Dano Médio",
+                        "top10": "Top 10",
+                        "Score_Pro": "Score Pro",
+                        "Score_Team": "Score Team",
+                        "Score_Elite": "Score Elite",
+                        "score": "Penalidade"
+                    }
                 )
-            else:
-                st.info("Nenhuma penalidade registrada.")
-
-    # ===============================
-    # PERFORMANCE COMPARATIVA
-    # ===============================
-    st.markdown("---")
-    st.markdown("### 📊 Performance Comparativa")
-
-    opcao_periodo = st.radio(
-        "Selecione o período:",
-        options=["📅 Por Semana", "🏆 Temporada Completa"],
-        horizontal=True
-    )
 
-    todos_os_nicks = df_bruto["nick"].unique()
+        abas_score = [
+            ("🔥 PRO Player", "Score_Pro",
+             "Fórmula PRO: Equilíbrio entre sobrevivência e agressividade. Valoriza consistência em vitórias, kills, precisão, suporte e dano."),
+            ("🤝 TEAM Player", "Score_Team",
+             "Fórmula TEAM: Foco total em suporte e sobrevivência coletiva. Valoriza vitórias, revives, assists e top10 por partida."),
+            ("🎯 Atirador de Elite", "Score_Elite",
+             "Fórmula ELITE: Prioriza KR, precisão de headshots por partida, alcance máximo e volume de dano."),
+        ]
+
+        *tabs_score, tab4 = st.tabs([titulo for titulo, _, _ in abas_score] + ["🤖 Bot Detector"])
+
+        df_valid = df_bruto[df_bruto["partidas"] > 0].copy()
+
+        # Todas as notas (com o decaimento por inatividade) num único produto matricial
+        if not ja_calculado:
+            with perf.fase("notas"):
+                scores = calcular_scores(df_valid)
+                df_valid[scores.columns] = scores
+
+        for tab, (_, col_score, explicacao) in zip(tabs_score, abas_score):
+            with tab, perf.fase("aba_ranking", score=col_score):
+                renderizar_ranking(df_valid, col_score, explicacao, descrever_formula(col_score))
+
+        with tab4, perf.fase("aba_ranking", score="score"):
+            if not df_bots_raw.empty:
+                df_bots = df_bots_raw[df_bots_raw["partidas"] > 0].copy()
+                if not df_bots.empty:
+                    renderizar_ranking(
+                        df_bots,
+                        "score",
+                        "Anti-Casual: Jogadores penalizados por matar bots em partidas no modo casual."
+                    )
+                else:
+                    st.info("Nenhuma penalidade registrada.")
+            elif outro_modo:
+                st.info("O Anti-Casual só avalia partidas de squad.")
+
+        # ===============================
+        # PERFORMANCE COMPARATIVA
+        # ===============================
+        st.markdown("---")
+        st.markdown("### 📊 Performance Comparativa")
+
+        # O histórico semanal (ranking_semanal) só existe para o squad
+        opcao_periodo = "🏆 Temporada Completa"
+        if not outro_modo:
+            opcao_periodo = st.radio(
+                "Selecione o período:",
+                options=["📅 Por Semana", "🏆 Temporada Completa"],
+                horizontal=True
+            )
 
-    if opcao_periodo == "📅 Por Semana":
-        if not df_semanal.empty:
-            df_semanal["semana"] = pd.to_datetime(df_semanal["semana"]).dt.tz_localize(None).dt.normalize()
-            data_corte = pd.Timestamp("2026-04-06").normalize()
-            df_semanal = df_semanal[df_semanal["semana"] >= data_corte].copy()
+        todos_os_nicks = df_bruto["nick"].unique()
 
+        if opcao_periodo == "📅 Por Semana":
             if not df_semanal.empty:
+                # O corte da temporada (INICIO_SEMANAS_TEMPORADA) já vem aplicado no SQL
+                df_semanal["semana"] = pd.to_datetime(df_semanal["semana"]).dt.tz_localize(None).dt.normalize()
+
                 semanas_disponiveis = sorted(df_semanal["semana"].unique(), reverse=True)
 
                 def formatar_semana(s):
@@ -480,89 +475,66 @@ if not df_bruto.empty:
                     key="filtro_semana_nova"
                 )
 
-                df_semana_atual = df_semanal[df_semanal["semana"] == semana_selecionada].copy()
-
-                idx_semana = opcoes_finais.index(semana_selecionada)
-                semana_anterior = opcoes_finais[idx_semana + 1] if idx_semana + 1 < len(opcoes_finais) else None
-
-                if semana_anterior is not None:
-                    df_semana_anterior = df_semanal[df_semanal["semana"] == semana_anterior].copy()
-                    df_semana_anterior = df_semana_anterior.set_index("nick")
+                # Deltas de todas as semanas (já com o desconto do ranking_bot semanal)
+                with perf.fase("painel_semanal"):
+                    painel = get_painel_semanal(versao, df_semanal, df_bot_semanal)
+                    df_semana_atual = painel.semana(semana_selecionada)
 
-                    for col in ["partidas", "vitorias", "kills", "assists", "headshots", "revives", "top10"]:
-                        def calcular_diff(row, col=col):
-                            nick = row["nick"]
-                            if nick in df_semana_anterior.index:
-                                return max(0, row[col] - df_semana_anterior.loc[nick, col])
-                            return 0
-
-                        df_semana_atual[col] = df_semana_atual.apply(calcular_diff, axis=1)
-
-                    df_semana_atual["kills_delta"] = df_semana_atual["kills"]
-                    df_semana_atual["dano_medio"] = df_semana_atual.apply(
-                        lambda r: r["dano_medio"] if r["kills_delta"] > 0 else 0, axis=1
-                    )
-                    df_semana_atual = df_semana_atual.drop(columns=["kills_delta"])
-
-                    df_semana_atual["kr"] = (
-                        df_semana_atual["kills"] /
-                        df_semana_atual["partidas"].replace(0, 1)
-                    ).round(2)
-
-                else:
+                if opcoes_finais.index(semana_selecionada) == len(opcoes_finais) - 1:
                     st.caption("📊 Estatísticas da Semana")
 
-                # Aplica deduções do ranking_bot semanal (delta da semana)
-                df_semana_atual = aplicar_deducoes_bot_semanal(
-                    df_semana_atual, df_bot_semanal,
-                    semana_atual=semana_selecionada,
-                    semana_anterior=semana_anterior
-                )
-
                 df_graf = pd.DataFrame({"nick": todos_os_nicks})
                 df_graf = df_graf.merge(df_semana_atual, on="nick", how="left").fillna(0)
 
                 st.caption(f"📊 Dados atuais: {semanas_labels[semana_selecionada]}")
             else:
-                st.info("Nenhum dado encontrado para a Temporada 41.")
+                st.info("Sem dados semanais no banco.")
                 df_graf = None
+
         else:
-            st.info("Sem dados semanais no banco.")
-            df_graf = None
+            df_graf = df_bruto.copy()
+
+        if df_graf is not None and not df_graf.empty:
+            col_g1, col_g2 = st.columns(2)
+            with col_g1:
+                grafico_horizontal(df_graf, "kills", "🎯 Kills", "#f63366")
+                grafico_horizontal(df_graf, "headshots", "💀 Headshots", "#0078ff")
+            with col_g2:
+                grafico_horizontal(df_graf, "vitorias", "🏆 Vitórias", "#00cc66")
+                grafico_horizontal(df_graf, "dano_medio", "🔥 Dano Médio", "#ff4b4b")
+
+        st.markdown("#### 🚩 Recordes Individuais")
+        if not df_valid.empty:
+            r1, r2, r3, r4 = st.columns(4)
+            with r1:
+                top = df_valid.loc[df_valid['kill_dist_max'].idxmax()]
+                st.info(f"**Sniper de Elite**\n\n{top['nick']}\n\n**{top['kill_dist_max']:.1f}m**")
+            with r2:
+                top = df_valid.loc[df_valid['revives'].idxmax()]
+                st.success(f"**Anjo da Guarda**\n\n{top['nick']}\n\n**{int(top['revives'])}** Revives")
+            with r3:
+                top = df_valid.loc[df_valid['assists'].idxmax()]
+                st.warning(f"**Braço Direito**\n\n{top['nick']}\n\n**{int(top['assists'])}** Assists")
+            with r4:
+                top = df_valid.loc[df_valid['partidas'].idxmax()]
+                st.error(f"**Viciado no Drop**\n\n{top['nick']}\n\n**{int(top['partidas'])}** Partidas")
+
+        st.markdown("---")
+        st.markdown(
+            "<div style='text-align:center;color:gray;padding:20px;'>📊 <b>By Adriano Vieira</b></div>",
+            unsafe_allow_html=True
+        )
 
     else:
-        df_graf = df_bruto.copy()
-
-    if df_graf is not None and not df_graf.empty:
-        col_g1, col_g2 = st.columns(2)
-        with col_g1:
-            grafico_horizontal(df_graf, "kills", "🎯 Kills", "#f63366")
-            grafico_horizontal(df_graf, "headshots", "💀 Headshots", "#0078ff")
-        with col_g2:
-            grafico_horizontal(df_graf, "vitorias", "🏆 Vitórias", "#00cc66")
-            grafico_horizontal(df_graf, "dano_medio", "🔥 Dano Médio", "#ff4b4b")
-
-    st.markdown("#### 🚩 Recordes Individuais")
-    if not df_valid.empty:
-        r1, r2, r3, r4 = st.columns(4)
-        with r1:
-            top = df_valid.loc[df_valid['kill_dist_max'].idxmax()]
-            st.info(f"**Sniper de Elite**\n\n{top['nick']}\n\n**{top['kill_dist_max']:.1f}m**")
-        with r2:
-            top = df_valid.loc[df_valid['revives'].idxmax()]
-            st.success(f"**Anjo da Guarda**\n\n{top['nick']}\n\n**{int(top['revives'])}** Revives")
-        with r3:
-            top = df_valid.loc[df_valid['assists'].idxmax()]
-            st.warning(f"**Braço Direito**\n\n{top['nick']}\n\n**{int(top['assists'])}** Assists")
-        with r4:
-            top = df_valid.loc[df_valid['partidas'].idxmax()]
-            st.error(f"**Viciado no Drop**\n\n{top['nick']}\n\n**{int(top['partidas'])}** Partidas")
-
-    st.markdown("---")
-    st.markdown(
-        "<div style='text-align:center;color:gray;padding:20px;'>📊 <b>By Adriano Vieira</b></div>",
-        unsafe_allow_html=True
-    )
+        st.warning("Conectado ao banco. Aguardando dados...")
+
+    return versao, modo
+
+try:
+    versao, modo = renderizar_pagina()
+finally:
+    # st.stop() ou uma exceção no meio da página não podem deixar o cProfile ligado
+    if perfilador is not None:
+        perfilador.disable()
 
-else:
-    st.warning("Conectado ao banco. Aguardando dados...")
+mostrar_perfil(versao=versao, modo=modo)
@@ -0,0 +1,234 @@
+# ranking_api.py
+# API HTTP somente leitura do ranking, para bots do Discord, overlays etc.
+# Não acorda o Streamlit nem dispara import: só lê as mesmas tabelas do dashboard.
+#
+#   python ranking_api.py --porta 8080
+#
+#   GET /ranking              ranking da temporada (com notas e posições)
+#   GET /bots                 penalidades do anti-casual
+#   GET /semanas              semanas disponíveis
+#   GET /semanal?semana=...   deltas da semana (padrão: a mais recente)
+#
+# Formato: ?formato=json|arrow|parquet ou pelo cabeçalho Accept.
+# Toda resposta leva um ETag derivado do carimbo de versão dos dados; com
+# If-None-Match igual, a resposta é um 304 sem corpo e sem consulta ao banco.
+import argparse
+import asyncio
+import hashlib
+import io
+import os
+import time
+import pandas as pd
+from aiohttp import web
+from sqlalchemy import create_engine
+from ranking_calculos import PainelSemanal, deduzir_bots, normalizar_numericos
+from ranking_consultas import INICIO_SEMANAS_TEMPORADA, ler_dados, ler_versao
+from ranking_formulas import FORMULAS
+from ranking_pontuacao import calcular_scores
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow/Parquet são opcionais; JSON funciona sem
+    pa = None
+
+DATABASE_URL = os.environ.get("DATABASE_URL")
+
+# Por quanto tempo o carimbo de versão é reaproveitado entre requisições
+SEGUNDOS_CACHE_VERSAO = int(os.environ.get("RANKING_API_CACHE_VERSAO", 10))
+
+TIPOS = {
+    "json": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+COLUNAS_INTEIRAS = [
+    "partidas", "vitorias", "kills",
+    "assists", "headshots", "revives", "dano_medio", "top10"
+]
+
+
+def montar_ranking(df, df_bots):
+    """Ranking da temporada com as notas e a posição em cada fórmula."""
+    df = normalizar_numericos(df.copy(), COLUNAS_INTEIRAS)
+    if not all(nome in df.columns for nome in FORMULAS):
+        df = deduzir_bots(df, normalizar_numericos(df_bots.copy(), COLUNAS_INTEIRAS))
+        df = df[df["partidas"] > 0].copy()
+        df[list(FORMULAS)] = calcular_scores(df)
+    else:
+        df = df[df["partidas"] > 0].copy()
+    for col in COLUNAS_INTEIRAS:
+        df[col] = df[col].astype(int)
+    for nome in FORMULAS:
+        df[f"Pos_{nome}"] = df[nome].rank(ascending=False, method="first").astype(int)
+    return df.drop(columns=["ultima_atualizacao"], errors="ignore").sort_values(
+        f"Pos_{next(iter(FORMULAS))}"
+    ).reset_index(drop=True)
+
+
+class Dados:
+    """Snapshot dos dados de uma versão, com as respostas já serializadas."""
+
+    def __init__(self, versao, brutos):
+        self.versao = versao
+        self.ranking = montar_ranking(brutos["ranking"], brutos["bots"])
+        self.bots = brutos["bots"]
+        if brutos["semanal"].empty:
+            self.painel = None
+        else:
+            self.painel = PainelSemanal.montar(brutos["semanal"], brutos["bot_semanal"])
+        self.respostas = {}
+
+    def semanas(self):
+        if self.painel is None:
+            return pd.DataFrame({"semana": []})
+        return pd.DataFrame({"semana": self.painel.semanas[::-1]})
+
+    def semanal(self, semana=None):
+        """``semana``: Timestamp já normalizado (ler_semana) ou None para a mais recente."""
+        if self.painel is None:
+            raise web.HTTPNotFound(text="Sem dados semanais")
+        if semana is None:
+            semana = self.painel.semanas[-1]
+        if semana not in self.painel.semanas:
+            raise web.HTTPNotFound(text=f"Semana {semana.date()} não encontrada")
+        return self.painel.semana(semana)
+
+
+class Repositorio:
+    """Lê o banco no máximo uma vez por versão dos dados.
+
+    O carimbo de versão é consultado a cada SEGUNDOS_CACHE_VERSAO; enquanto não
+    muda, todas as requisições são servidas da memória.
+    """
+
+    def __init__(self, engine, inicio_semanas=INICIO_SEMANAS_TEMPORADA):
+        self.engine = engine
+        self.inicio_semanas = inicio_semanas
+        self.dados = None
+        self._versao = None
+        self._versao_em = 0.0
+        self._trava = None
+
+    @property
+    def trava(self):
+        # Criada dentro do loop do servidor (no 3.9 o Lock se prende ao loop atual)
+        if self._trava is None:
+            self._trava = asyncio.Lock()
+        return self._trava
+
+    def _ler_versao(self):
+        with self.engine.connect() as c:
+            return ler_versao(c)
+
+    def _ler_dados(self, versao, materializado):
+        with self.engine.connect() as c:
+            brutos = ler_dados(c, self.inicio_semanas, materializado)
+        return Dados(versao, brutos)
+
+    async def versao(self):
+        loop = asyncio.get_running_loop()
+        async with self.trava:
+            if self._versao is None or time.monotonic() - self._versao_em > SEGUNDOS_CACHE_VERSAO:
+                self._versao = await loop.run_in_executor(None, self._ler_versao)
+                self._versao_em = time.monotonic()
+            return self._versao
+
+    async def atuais(self):
+        versao, materializado = await self.versao()
+        loop = asyncio.get_running_loop()
+        async with self.trava:
+            if self.dados is None or self.dados.versao != versao:
+                print(f"🔄 Carregando dados da versão {versao}")
+                self.dados = await loop.run_in_executor(None, self._ler_dados, versao, materializado)
+            return self.dados
+
+
+def escolher_formato(request):
+    formato = request.query.get("formato")
+    if formato is None:
+        aceita = request.headers.get("Accept", "")
+        formato = next((f for f, tipo in TIPOS.items() if tipo in aceita), "json")
+    if formato not in TIPOS:
+        raise web.HTTPBadRequest(text=f"Formato desconhecido: {formato}")
+    if formato != "json" and pa is None:
+        raise web.HTTPNotAcceptable(text="pyarrow não instalado: só JSON disponível")
+    return formato
+
+
+def serializar(df, formato):
+    if formato == "json":
+        return df.to_json(orient="records", date_format="iso", force_ascii=False).encode()
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    buffer = io.BytesIO()
+    if formato == "arrow":
+        with pa.ipc.new_stream(buffer, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(tabela, buffer)
+    return buffer.getvalue()
+
+
+def ler_semana(request):
+    """?semana= normalizada para o início do dia; None quando não informada."""
+    texto = request.query.get("semana")
+    if not texto:
+        return None
+    try:
+        return pd.Timestamp(texto).normalize()
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"Semana inválida: {texto}")
+
+
+def etag(versao, chave):
+    return '"' + hashlib.sha1(f"{versao}|{chave}".encode()).hexdigest()[:20] + '"'
+
+
+def rota(nome, extrair, por_semana=False):
+    async def handler(request):
+        repo = request.app["repositorio"]
+        formato = escolher_formato(request)
+        # Chave pela semana normalizada: grafias diferentes da mesma data dividem a resposta
+        semana = ler_semana(request) if por_semana else None
+        chave = f"{nome}|{'' if semana is None else semana.isoformat()}|{formato}"
+
+        # 304 antes de tocar nos dados: só depende do carimbo de versão
+        versao, _ = await repo.versao()
+        tag = etag(versao, chave)
+        cabecalhos = {"ETag": tag, "Cache-Control": f"public, max-age={SEGUNDOS_CACHE_VERSAO}"}
+        if tag in request.headers.get("If-None-Match", ""):
+            return web.Response(status=304, headers=cabecalhos)
+
+        dados = await repo.atuais()
+        tag = etag(dados.versao, chave)
+        cabecalhos["ETag"] = tag
+        if chave not in dados.respostas:
+            dados.respostas[chave] = serializar(extrair(dados, semana), formato)
+        return web.Response(body=dados.respostas[chave], content_type=TIPOS[formato], headers=cabecalhos)
+
+    return handler
+
+
+def criar_app(engine):
+    app = web.Application()
+    app["repositorio"] = Repositorio(engine)
+    app.router.add_get("/ranking", rota("ranking", lambda d, semana: d.ranking))
+    app.router.add_get("/bots", rota("bots", lambda d, semana: d.bots))
+    app.router.add_get("/semanas", rota("semanas", lambda d, semana: d.semanas()))
+    app.router.add_get("/semanal", rota("semanal", lambda d, semana: d.semanal(semana), por_semana=True))
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API somente leitura do ranking")
+    parser.add_argument("--host", default=os.environ.get("RANKING_API_HOST", "0.0.0.0"))
+    parser.add_argument("--porta", type=int, default=int(os.environ.get("RANKING_API_PORTA", 8080)))
+    args = parser.parse_args()
+
+    if not DATABASE_URL:
+        raise SystemExit("❌ DATABASE_URL não definido")
+
+    engine = create_engine(DATABASE_URL, pool_size=2, pool_pre_ping=True)
+    print(f"🌐 API do ranking em http://{args.host}:{args.porta}")
+    web.run_app(criar_app(engine), host=args.host, port=args.porta, print=None)
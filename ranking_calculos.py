@@ -0,0 +1,239 @@
+# ranking_calculos.py
+# Cálculos do dashboard em pandas/NumPy puro (sem Streamlit), para poderem
+# ser reaproveitados e medidos fora da página.
+import numpy as np
+import pandas as pd
+from ranking_formulas import COLUNAS_DEDUCAO
+
+
+def normalizar_numericos(df, colunas):
+    colunas = [c for c in colunas if c in df.columns]
+    if colunas:
+        df[colunas] = df[colunas].apply(pd.to_numeric, errors="coerce").fillna(0)
+    return df
+
+
+def _por_nick(df, colunas):
+    return df.drop_duplicates("nick").set_index("nick")[colunas].abs()
+
+
+def subtrair_por_nick(df, deducoes, colunas):
+    """Subtrai ``deducoes`` (indexado por nick) das linhas de ``df``, sem passar de zero.
+
+    Retorna o DataFrame e a máscara das linhas que tinham dedução.
+    """
+    nicks = df["nick"].to_numpy()
+    tem_deducao = np.asarray(pd.Index(deducoes.index).get_indexer(nicks) >= 0)
+    valores = deducoes.reindex(nicks).fillna(0).to_numpy(dtype=float)
+
+    for i, col in enumerate(colunas):
+        novo = np.maximum(df[col].to_numpy(dtype=float) - valores[:, i], 0)
+        if pd.api.types.is_integer_dtype(df[col]):
+            novo = novo.astype(df[col].dtype)
+        df[col] = novo
+
+    return df, tem_deducao
+
+
+def deduzir_bots(df, df_bots, colunas=COLUNAS_DEDUCAO):
+    """Desconta do total da temporada o que foi jogado em partidas casuais.
+
+    Recalcula o kr (kills / partidas limpas) das linhas afetadas.
+    """
+    if df_bots.empty:
+        return df
+
+    colunas = [c for c in colunas if c in df.columns and c in df_bots.columns]
+    df, tem_deducao = subtrair_por_nick(df, _por_nick(df_bots, colunas), colunas)
+
+    if "kr" in df.columns and tem_deducao.any():
+        partidas = np.maximum(df["partidas"].to_numpy(dtype=float), 1)
+        kr_limpo = df["kills"].to_numpy(dtype=float) / partidas
+        df["kr"] = np.where(tem_deducao, kr_limpo, df["kr"].to_numpy(dtype=float))
+
+    return df
+
+
+# Prefixos que o ranking coloca no nick conforme a zona
+EMOJIS_ZONA = ["💀", "💩", "👤"]
+_EMOJIS_ZONA_RE = "|".join(EMOJIS_ZONA)
+
+COLUNAS_RANKING = [
+    "Pos", "Classificação", "nick",
+    "partidas", "kr", "vitorias",
+    "kills", "assists", "headshots",
+    "revives", "kill_dist_max", "dano_medio", "top10"
+]
+
+
+def limpar_nicks(nicks):
+    """Remove os emojis de zona; feito uma vez no carregamento (coluna nick_limpo)."""
+    return nicks.astype(str).str.replace(_EMOJIS_ZONA_RE, "", regex=True).str.strip()
+
+
+def processar_ranking_completo(df_ranking, col_score):
+    total = len(df_ranking)
+    is_bot_ranking = col_score == "score"
+
+    df_ranking = df_ranking.sort_values(
+        by=col_score,
+        ascending=is_bot_ranking
+    ).reset_index(drop=True)
+
+    pos = np.arange(1, total + 1)
+    zona = [pos <= 3, pos > (total - 3)]
+    prefixos = np.select(zona, ["💀 ", "💩 "], default="👤 ")
+
+    if "nick_limpo" in df_ranking.columns:
+        nicks_limpos = df_ranking["nick_limpo"]
+    else:
+        nicks_limpos = limpar_nicks(df_ranking["nick"])
+
+    df_ranking["Pos"] = pos
+    df_ranking["nick"] = pd.Series(prefixos, index=df_ranking.index, dtype=object) + nicks_limpos.astype(object)
+    df_ranking["Classificação"] = np.select(zona, ["Elite Zone", "Cocô Zone"], default="Medíocre Zone")
+
+    cols_base = list(COLUNAS_RANKING)
+    if col_score not in cols_base:
+        cols_base.append(col_score)
+
+    return df_ranking[cols_base]
+
+
+def highlight_zones(row):
+    if row["Classificação"] == "Elite Zone":
+        return ["background-color:#003300;color:white;font-weight:bold"] * len(row)
+    if row["Classificação"] == "Cocô Zone":
+        return ['background-color: #5A3E1B; color: white; font-weight: bold'] * len(row)
+    return [""] * len(row)
+
+
+def estilizar_ranking(ranking_final, col_score):
+    """Styler da tabela do ranking (gradiente na nota, cores por zona e formatos)."""
+    if col_score == "score":
+        format_dict = {
+            "kr": lambda x: f"- {abs(x):.2f}",
+            "kill_dist_max": lambda x: f"- {abs(x):.2f}",
+            "partidas": lambda x: f"- {int(abs(x))}",
+            "vitorias": lambda x: f"- {int(abs(x))}",
+            "kills": lambda x: f"- {int(abs(x))}",
+            "assists": lambda x: f"- {int(abs(x))}",
+            "headshots": lambda x: f"- {int(abs(x))}",
+            "revives": lambda x: f"- {int(abs(x))}",
+            "dano_medio": lambda x: f"- {int(abs(x))}",
+            "top10": lambda x: f"- {int(abs(x))}",
+            col_score: "{:.2f}"
+        }
+    else:
+        format_dict = {
+            "kr": "{:.2f}",
+            "kill_dist_max": "{:.2f}",
+            col_score: "{:.2f}",
+            "partidas": "{:d}",
+            "vitorias": "{:d}",
+            "kills": "{:d}",
+            "assists": "{:d}",
+            "headshots": "{:d}",
+            "revives": "{:d}",
+            "dano_medio": "{:d}",
+            "top10": "{:d}"
+        }
+
+    return (
+        ranking_final.style
+        .background_gradient(cmap='YlGnBu' if col_score != 'score' else 'RdYlGn', subset=[col_score])
+        .apply(highlight_zones, axis=1)
+        .format(format_dict)
+    )
+
+
+COLUNAS_SEMANAIS = [
+    "partidas", "kr", "vitorias", "kills", "assists",
+    "headshots", "revives", "kill_dist_max", "dano_medio", "top10"
+]
+
+
+def _normalizar_semanas(serie):
+    return pd.to_datetime(serie).dt.tz_localize(None).dt.normalize()
+
+
+def _cubo(df, nicks, semanas, colunas):
+    """Pivota linhas (nick, semana) num array denso nick × semana × coluna."""
+    df = df.assign(semana=_normalizar_semanas(df["semana"])).drop_duplicates(["nick", "semana"])
+    i = nicks.get_indexer(df["nick"])
+    j = semanas.get_indexer(df["semana"])
+    validas = (i >= 0) & (j >= 0)
+
+    valores = np.zeros((len(nicks), len(semanas), len(colunas)))
+    presente = np.zeros((len(nicks), len(semanas)), dtype=bool)
+    dados = df[colunas].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+    valores[i[validas], j[validas]] = dados[validas]
+    presente[i[validas], j[validas]] = True
+    return valores, presente
+
+
+class PainelSemanal:
+    """ranking_semanal pivotado em nick × semana × stat com os deltas já calculados.
+
+    Montado uma vez por versão dos dados; trocar de semana é só uma fatia do array.
+    O delta de uma semana é o acumulado dela menos o da semana anterior (0 para quem
+    não tinha linha na anterior); a semana mais antiga fica com os valores brutos.
+    O delta semanal do ranking_bot já vem descontado.
+    """
+
+    def __init__(self, nicks, semanas, valores, presente, colunas=COLUNAS_SEMANAIS):
+        self.nicks = nicks
+        self.semanas = semanas
+        self.valores = valores
+        self.presente = presente
+        self.colunas = list(colunas)
+
+    @classmethod
+    def montar(cls, df_semanal, df_bot_semanal=None, colunas=COLUNAS_SEMANAIS):
+        colunas = [c for c in colunas if c in df_semanal.columns]
+        semanas = pd.DatetimeIndex(sorted(_normalizar_semanas(df_semanal["semana"]).unique()))
+        nicks = pd.Index(sorted(df_semanal["nick"].unique()))
+        bruto, presente = _cubo(df_semanal, nicks, semanas, colunas)
+
+        idx = {c: k for k, c in enumerate(colunas)}
+        deducao = [idx[c] for c in COLUNAS_DEDUCAO if c in idx]
+        valores = bruto.copy()
+
+        if len(semanas) > 1:
+            atual, anterior = bruto[:, 1:], bruto[:, :-1]
+            tinha_anterior = presente[:, :-1, None]
+            valores[:, 1:, deducao] = np.where(
+                tinha_anterior, np.maximum(atual[..., deducao] - anterior[..., deducao], 0), 0
+            )
+            if "dano_medio" in idx and "kills" in idx:
+                valores[:, 1:, idx["dano_medio"]] = np.where(
+                    valores[:, 1:, idx["kills"]] > 0, atual[..., idx["dano_medio"]], 0
+                )
+            if "kr" in idx and "kills" in idx and "partidas" in idx:
+                partidas = valores[:, 1:, idx["partidas"]]
+                valores[:, 1:, idx["kr"]] = np.round(
+                    valores[:, 1:, idx["kills"]] / np.where(partidas == 0, 1, partidas), 2
+                )
+
+        if df_bot_semanal is not None and not df_bot_semanal.empty:
+            col_bot = [colunas[k] for k in deducao if colunas[k] in df_bot_semanal.columns]
+            pos_bot = [idx[c] for c in col_bot]
+            bot, bot_presente = _cubo(df_bot_semanal, nicks, semanas, col_bot)
+            bot = np.abs(bot)
+            bot_anterior = np.zeros_like(bot)
+            bot_anterior[:, 1:] = bot[:, :-1]
+            delta = np.where(bot_presente[..., None], np.maximum(bot - bot_anterior, 0), 0)
+            valores[..., pos_bot] = np.maximum(valores[..., pos_bot] - delta, 0)
+
+        return cls(nicks, semanas, valores, presente, colunas)
+
+    def semana(self, semana):
+        j = self.semanas.get_loc(pd.Timestamp(semana))
+        linhas = self.presente[:, j]
+        df = pd.DataFrame(self.valores[linhas, j, :], columns=self.colunas)
+        for col in self.colunas:
+            if col not in ("kr", "kill_dist_max"):
+                df[col] = df[col].astype("int64")
+        df.insert(0, "nick", self.nicks[linhas])
+        df.insert(1, "semana", self.semanas[j])
+        return df
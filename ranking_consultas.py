@@ -0,0 +1,135 @@
+# ranking_consultas.py
+# Consultas de leitura do ranking, compartilhadas pelo dashboard (pubgappscore.py)
+# e pela API somente leitura (ranking_api.py). Usam SQLAlchemy (text + :params).
+import pandas as pd
+from sqlalchemy import text
+from ranking_materializado import MV_RANKING, sql_notas_com_decaimento
+
+# Primeira semana (segunda-feira) exibida na Season 41
+INICIO_SEMANAS_TEMPORADA = "2026-04-06"
+
+# Carimbo barato da versão dos dados: só muda quando um import grava algo.
+# atualizado_em só anda quando as stats mudam; updated_at (só a data da última
+# partida) e verificado_em (sync sem mudança) entram para o decaimento não ficar velho
+SQL_VERSAO = f"""
+    SELECT CONCAT_WS('|',
+        (SELECT MAX(atualizado_em) FROM ranking_squad),
+        (SELECT MAX(updated_at) FROM ranking_squad),
+        (SELECT MAX(atualizado_em) FROM ranking_bot),
+        (SELECT MAX(atualizado_em) FROM ranking_semanal),
+        (SELECT MAX(semana) FROM ranking_bot_semanal)
+    ) AS versao,
+    to_regclass('{MV_RANKING}') IS NOT NULL AS materializado,
+    to_regclass('importacao_estado') IS NOT NULL AS tem_estado
+"""
+
+# O refresh da view roda depois do commit do import: entra no carimbo também
+SQL_CALCULADO_EM = f"SELECT MAX(calculado_em) AS calculado_em FROM {MV_RANKING}"
+
+# importacao_estado só existe depois da primeira execução do pubg_import.py, e
+# uma subconsulta a uma tabela inexistente falha já no parse (não dá para
+# protegê-la no mesmo SELECT): só é lida quando SQL_VERSAO diz que existe
+SQL_VERIFICADO_EM = "SELECT MAX(verificado_em) AS verificado_em FROM importacao_estado"
+
+COLUNAS_STATS = (
+    "partidas, kr, vitorias, kills, assists, headshots, "
+    "revives, kill_dist_max, dano_medio, top10"
+)
+
+# Só as colunas que a página usa; o corte da temporada vai para o WHERE
+CONSULTAS = {
+    "ranking": f"""
+        SELECT nick, {COLUNAS_STATS}, updated_at, atualizado_em,
+               MAX(atualizado_em) OVER () AS ultima_atualizacao
+        FROM v_ranking_squad_completo
+    """,
+    "bots": f"SELECT nick, {COLUNAS_STATS}, score FROM ranking_bot",
+    "semanal": f"""
+        SELECT nick, semana, {COLUNAS_STATS}
+        FROM ranking_semanal
+        WHERE semana >= :inicio
+        ORDER BY semana DESC
+    """,
+    "bot_semanal": """
+        SELECT nick, semana, partidas, vitorias, kills, assists, headshots, revives, top10
+        FROM ranking_bot_semanal
+        WHERE semana >= :inicio
+        ORDER BY semana DESC
+    """,
+}
+
+# Com a materialized view criada pelos importadores, o ranking já vem com as
+# deduções do anti-casual e as notas calculadas no banco; o decaimento é do momento da leitura
+CONSULTA_RANKING_MATERIALIZADO = f"""
+    SELECT nick, {COLUNAS_STATS}, updated_at, atualizado_em, {sql_notas_com_decaimento()},
+           MAX(atualizado_em) OVER () AS ultima_atualizacao
+    FROM {MV_RANKING}
+"""
+
+
+# Modos de jogo gravados pelo pubg_import.py em stats_modos (todos vêm da mesma
+# requisição de stats da temporada). O squad continua vindo das consultas acima,
+# com o desconto do anti-casual e o histórico semanal.
+MODO_PADRAO = "squad"
+
+_TEMPORADA_MODOS = "(SELECT season_id FROM stats_modos ORDER BY atualizado_em DESC LIMIT 1)"
+
+# Um carimbo de versão por modo: quem só jogou duo não mexe no ranking_squad.
+# O updated_at do ranking_squad (usado no decaimento) também entra no carimbo
+SQL_MODOS = f"""
+    SELECT m.modo, COUNT(*) AS jogadores,
+           CONCAT_WS('|', MAX(m.atualizado_em), MAX(r.updated_at)) AS versao
+    FROM stats_modos m
+    LEFT JOIN ranking_squad r ON r.nick = m.nick
+    WHERE m.season_id = {_TEMPORADA_MODOS}
+    GROUP BY m.modo
+    ORDER BY m.modo
+"""
+
+# updated_at (última partida, de qualquer modo) vem do ranking_squad para o decaimento
+CONSULTA_RANKING_MODO = f"""
+    SELECT m.nick, {", ".join(f"m.{c.strip()}" for c in COLUNAS_STATS.split(","))},
+           r.updated_at, m.atualizado_em,
+           MAX(m.atualizado_em) OVER () AS ultima_atualizacao
+    FROM stats_modos m
+    LEFT JOIN ranking_squad r ON r.nick = m.nick
+    WHERE m.modo = :modo AND m.season_id = {_TEMPORADA_MODOS}
+"""
+
+
+def ler_ranking_modo(conn, modo):
+    return pd.read_sql(text(CONSULTA_RANKING_MODO), conn, params={"modo": modo})
+
+
+def montar_versao(df_versao, df_calculado=None, df_verificado=None):
+    """(versao, materializado) a partir de SQL_VERSAO, SQL_CALCULADO_EM e SQL_VERIFICADO_EM."""
+    versao = str(df_versao["versao"].iloc[0])
+    materializado = bool(df_versao["materializado"].iloc[0])
+    if df_verificado is not None:
+        versao = f"{versao}|v:{df_verificado['verificado_em'].iloc[0]}"
+    if materializado and df_calculado is not None:
+        versao = f"{versao}|mv:{df_calculado['calculado_em'].iloc[0]}"
+    return versao, materializado
+
+
+def ler_versao(conn):
+    df_versao = pd.read_sql(text(SQL_VERSAO), conn)
+    df_calculado = df_verificado = None
+    if bool(df_versao["materializado"].iloc[0]):
+        df_calculado = pd.read_sql(text(SQL_CALCULADO_EM), conn)
+    if bool(df_versao["tem_estado"].iloc[0]):
+        df_verificado = pd.read_sql(text(SQL_VERIFICADO_EM), conn)
+    return montar_versao(df_versao, df_calculado, df_verificado)
+
+
+def ler_dados(conn, inicio_semanas=INICIO_SEMANAS_TEMPORADA, materializado=False):
+    """As quatro consultas numa única transação REPEATABLE READ (snapshot consistente)."""
+    consultas = dict(CONSULTAS)
+    if materializado:
+        consultas["ranking"] = CONSULTA_RANKING_MATERIALIZADO
+    conn = conn.execution_options(isolation_level="REPEATABLE READ")
+    with conn.begin():
+        return {
+            nome: pd.read_sql(text(sql), conn, params={"inicio": inicio_semanas})
+            for nome, sql in consultas.items()
+        }
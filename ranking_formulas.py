@@ -0,0 +1,42 @@
+# ranking_formulas.py
+# Declaração dos rankings, sem dependências: usada pelo dashboard (NumPy) e
+# pelos importadores (SQL do ranking materializado).
+
+# Colunas que o anti-casual acumula no ranking_bot e que são descontadas
+COLUNAS_DEDUCAO = ["partidas", "vitorias", "kills", "assists", "headshots", "revives", "top10"]
+
+# Stats divididas pelo número de partidas antes de entrar na fórmula
+POR_PARTIDA = ["vitorias", "kills", "assists", "headshots", "revives", "top10"]
+# Stats que já são médias/máximos e entram como estão
+ABSOLUTAS = ["kr", "kill_dist_max", "dano_medio"]
+
+FEATURES = POR_PARTIDA + ABSOLUTAS
+
+ROTULOS = {
+    "vitorias": "Win Rate",
+    "kills": "Kills",
+    "assists": "Assists",
+    "headshots": "Headshots",
+    "revives": "Revives",
+    "top10": "Top10",
+    "kr": "KR",
+    "kill_dist_max": "Kill Dist Máx",
+    "dano_medio": "Dano Médio",
+}
+
+# Uma linha de pesos por ranking; a ordem é a da legenda exibida na aba
+FORMULAS = {
+    "Score_Pro": {
+        "vitorias": 5, "kills": 0.5, "assists": 0.1, "headshots": 0.2,
+        "revives": 0.33, "top10": 0.1, "dano_medio": 0.001,
+    },
+    "Score_Team": {
+        "vitorias": 8, "revives": 5, "assists": 3, "top10": 2, "dano_medio": 0.001,
+    },
+    "Score_Elite": {
+        "kr": 15, "headshots": 3, "kill_dist_max": 0.05, "dano_medio": 0.003, "kills": 0.5,
+    },
+}
+
+# -15% a cada 7 dias sem jogar
+DECAIMENTO_SEMANAL = 0.85
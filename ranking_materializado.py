@@ -0,0 +1,95 @@
+# ranking_materializado.py
+# Ranking final (deduções do anti-casual e notas) calculado no Postgres e
+# atualizado pelos importadores a cada sync. O decaimento por inatividade
+# depende da hora da leitura, então fica na consulta (sql_notas_com_decaimento).
+import hashlib
+from ranking_formulas import COLUNAS_DEDUCAO, DECAIMENTO_SEMANAL, FORMULAS, POR_PARTIDA
+
+MV_RANKING = "mv_ranking_pontuacao"
+
+
+def _expr_feature(feature):
+    if feature in POR_PARTIDA:
+        return f"{feature}::float8 / GREATEST(partidas, 1)"
+    return f"{feature}::float8"
+
+
+def _limpo(col):
+    return f"GREATEST(v.{col} - ABS(COALESCE(b.{col}, 0)), 0)"
+
+
+def sql_ranking_materializado():
+    """SELECT do ranking materializado, gerado a partir das mesmas FORMULAS do dashboard."""
+    deducoes = ",\n           ".join(f"{_limpo(c)} AS {c}" for c in COLUNAS_DEDUCAO)
+    notas = ",\n           ".join(
+        "ROUND(("
+        + " + ".join(f"{peso} * {_expr_feature(feature)}" for feature, peso in pesos.items())
+        + f")::numeric, 2)::float8 AS \"{nome}\""
+        for nome, pesos in FORMULAS.items()
+    )
+    return f"""
+WITH limpo AS (
+    SELECT v.nick,
+           {deducoes},
+           CASE WHEN b.nick IS NULL THEN v.kr::float8
+                ELSE {_limpo("kills")}::float8 / GREATEST({_limpo("partidas")}, 1)
+           END AS kr,
+           v.kill_dist_max, v.dano_medio, v.updated_at, v.atualizado_em
+    FROM v_ranking_squad_completo v
+    LEFT JOIN ranking_bot b ON b.nick = v.nick
+),
+referencia AS (
+    SELECT limpo.*,
+           COALESCE(
+               updated_at::timestamp AT TIME ZONE 'UTC',
+               atualizado_em::timestamptz,
+               TIMESTAMPTZ '2000-01-01 00:00:00+00'
+           ) AS inativo_desde
+    FROM limpo
+)
+SELECT referencia.*,
+       {notas},
+       NOW() AS calculado_em
+FROM referencia
+"""
+
+
+def sql_notas_com_decaimento():
+    """Colunas de nota da view já com o decaimento por semana inativa, calculado na leitura."""
+    semanas = "FLOOR(EXTRACT(EPOCH FROM (NOW() - inativo_desde)) / 604800)"
+    return ", ".join(
+        f"\"{nome}\" * POWER({DECAIMENTO_SEMANAL}::float8, {semanas}) AS \"{nome}\""
+        for nome in FORMULAS
+    )
+
+
+def garantir_ranking_materializado(cursor):
+    """Cria (ou recria, se as fórmulas mudaram) a materialized view. Retorna True se criou."""
+    sql = sql_ranking_materializado()
+    assinatura = hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+    cursor.execute("SELECT obj_description(to_regclass(%s), 'pg_class')", (MV_RANKING,))
+    if cursor.fetchone()[0] == assinatura:
+        return False
+
+    print(f"🧮 Criando {MV_RANKING} (fórmulas novas ou primeira execução)...")
+    cursor.execute(f"DROP MATERIALIZED VIEW IF EXISTS {MV_RANKING}")
+    cursor.execute(f"CREATE MATERIALIZED VIEW {MV_RANKING} AS {sql}")
+    cursor.execute(f"CREATE UNIQUE INDEX ON {MV_RANKING} (nick)")
+    cursor.execute(f"COMMENT ON MATERIALIZED VIEW {MV_RANKING} IS %s", (assinatura,))
+    return True
+
+
+def atualizar_ranking_materializado(conn):
+    """Recalcula o ranking depois do commit do sync; leitores não são bloqueados."""
+    cursor = conn.cursor()
+    try:
+        if not garantir_ranking_materializado(cursor):
+            cursor.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {MV_RANKING}")
+        conn.commit()
+        print(f"🧮 {MV_RANKING} atualizado.")
+    except Exception as e:
+        conn.rollback()
+        print(f"⚠️ Não foi possível atualizar {MV_RANKING}: {e}")
+    finally:
+        cursor.close()
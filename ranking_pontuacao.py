@@ -0,0 +1,48 @@
+# ranking_pontuacao.py
+# Fórmulas dos rankings declaradas como pesos sobre uma matriz de stats.
+# Todas as notas saem de um único produto matricial; o decaimento por
+# inatividade é calculado uma vez e aplicado a todas as colunas.
+import numpy as np
+import pandas as pd
+from ranking_formulas import ABSOLUTAS, DECAIMENTO_SEMANAL, FEATURES, FORMULAS, POR_PARTIDA, ROTULOS
+
+
+def matriz_pesos(formulas=FORMULAS):
+    pesos = np.zeros((len(FEATURES), len(formulas)))
+    for j, pesos_formula in enumerate(formulas.values()):
+        for feature, peso in pesos_formula.items():
+            pesos[FEATURES.index(feature), j] = peso
+    return pesos
+
+
+def matriz_stats(df):
+    partidas = np.maximum(df["partidas"].to_numpy(dtype=float), 1)
+    por_partida = df[POR_PARTIDA].to_numpy(dtype=float) / partidas[:, None]
+    absolutas = df[ABSOLUTAS].to_numpy(dtype=float)
+    return np.hstack([por_partida, absolutas])
+
+
+def semanas_inativo(df, agora=None):
+    agora = agora if agora is not None else pd.Timestamp.now(tz="UTC")
+    updated_at = pd.to_datetime(df["updated_at"], utc=True, errors="coerce")
+    atualizado_em = pd.to_datetime(df["atualizado_em"], utc=True, errors="coerce")
+    referencia = updated_at.fillna(atualizado_em).fillna(pd.Timestamp("2000-01-01", tz="UTC"))
+    dias = (agora - referencia).dt.days.fillna(0)
+    return (dias // 7).astype(int).to_numpy()
+
+
+def fator_decaimento(df, agora=None):
+    return DECAIMENTO_SEMANAL ** semanas_inativo(df, agora)
+
+
+def calcular_scores(df, formulas=FORMULAS, agora=None):
+    """Retorna um DataFrame (mesmo índice de ``df``) com uma coluna por fórmula."""
+    if df.empty:
+        return pd.DataFrame(index=df.index, columns=list(formulas), dtype=float)
+    notas = np.round(matriz_stats(df) @ matriz_pesos(formulas), 2)
+    notas = notas * fator_decaimento(df, agora)[:, None]
+    return pd.DataFrame(notas, index=df.index, columns=list(formulas))
+
+
+def descrever_formula(nome, formulas=FORMULAS):
+    return " | ".join(f"({ROTULOS[feature]}: {peso:g})" for feature, peso in formulas[nome].items())
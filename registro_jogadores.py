@@ -0,0 +1,236 @@
+# registro_jogadores.py
+# Cadastro do squad no banco (tabela players), lido pelo pubg_import.py e
+# pelo anti_casual.py. O account_id de cada nick é resolvido uma vez via
+# /players?filter[playerNames]= e só de novo quando o nick muda no cadastro
+# ou quando a busca pelo id não o encontra. A temporada atual fica em
+# cache_api com validade longa.
+#
+#   python registro_jogadores.py --listar
+#   python registro_jogadores.py --adicionar Nick1 Nick2
+#   python registro_jogadores.py --desativar Nick1
+import os
+import argparse
+from psycopg2.extras import execute_values
+from pubg_api import BASE_URL
+
+# Filtros de /players aceitam no máximo 10 nomes ou ids por chamada
+LOTE_API = 10
+# A temporada muda a cada ~2 meses; /seasons só é consultado depois disso
+TTL_TEMPORADA_H = int(os.environ.get("PUBG_TEMPORADA_TTL_H", 12))
+
+# Semente do cadastro: só entra quando a tabela players ainda está vazia
+JOGADORES_INICIAIS = {
+    "Adrian-Wan": "account.58beb24ada7346408942d42dc64c7901",
+    "MironoteuCool": "account.24b0600cbba342eab1546ae2881f50fa",
+    "FabioEspeto": "account.d8ccad228a4a417dad9921616d6c6bcd",
+    "Mamutag_Komander": "account.64c62d76cce74d0b99857a27975e350e",
+    "Robson_Foz": "account.8142e6d837254ee1bca954b719692f38",
+    "MEIRAA": "account.c3f37890e7534978abadaf4bae051390",
+    "EL-LOCORJ": "account.94ab932726fc4c64a03eb9797429baa3",
+    "SalaminhoKBD": "account.de093e200d3441a9b781a9717a017dd3",
+    "nelio_ponto_dev": "account.ad39c88ddf754d33a3dfeadc117c47df",
+    "CARNEIROOO": "account.8c0313f2148d47b7bffcde634f094445",
+    "Kowalski_PR": "account.b25200afe120424a839eb56dd2bc49cb",
+    "Zacouteguy": "account.a742bf1d5725467c91140cd0ed83c265",
+    "Sidors": "account.60ab21fad4094824a32dc404420b914d",
+    "Takato_Matsuki": "account.10d2403139bd4066a95dda1a3eefe1e8",
+    "cmm01": "account.80cedebb935242469fdd177454a52e0e",
+    "Petrala": "account.aadd1c378ff841219d853b4ad2646286",
+    "O-CARRASCO": "account.78c6f7bd39da4274b5a3196ac624e92e",
+    "DET4N4KA": "account.25ca8d1984854e01940a4509c595d9ff",
+    "LeandroTW2": "account.a868cc4764a6447bb8f72649c73f5dab",
+}
+
+
+def garantir_registro(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS players (
+        nick TEXT PRIMARY KEY,
+        account_id TEXT UNIQUE,
+        nick_resolvido TEXT,
+        ativo BOOLEAN NOT NULL DEFAULT TRUE,
+        resolvido_em TIMESTAMPTZ,
+        criado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS cache_api (
+        chave TEXT PRIMARY KEY,
+        valor TEXT NOT NULL,
+        atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """)
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM players)")
+    if not cursor.fetchone()[0]:
+        execute_values(
+            cursor,
+            "INSERT INTO players (nick, account_id, nick_resolvido, resolvido_em) VALUES %s ON CONFLICT DO NOTHING",
+            [(nick, account_id, nick) for nick, account_id in JOGADORES_INICIAIS.items()],
+            template="(%s, %s, %s, NOW())"
+        )
+        print(f"🌱 Cadastro de jogadores criado com {len(JOGADORES_INICIAIS)} jogador(es)")
+
+
+def carregar_registro(cursor):
+    """nick -> (account_id gravado, precisa resolver por nome) dos jogadores ativos."""
+    cursor.execute("""
+    SELECT nick, account_id, nick_resolvido IS DISTINCT FROM nick OR account_id IS NULL
+    FROM players
+    WHERE ativo
+    ORDER BY nick
+    """)
+    return {nick: (account_id, pendente) for nick, account_id, pendente in cursor.fetchall()}
+
+
+def lotes(lista, tamanho=LOTE_API):
+    lista = list(lista)
+    for i in range(0, len(lista), tamanho):
+        yield lista[i:i + tamanho]
+
+
+def url_por_nomes(nomes):
+    return f"{BASE_URL}/players?filter[playerNames]={','.join(nomes)}"
+
+
+def url_por_ids(ids):
+    return f"{BASE_URL}/players?filter[playerIds]={','.join(ids)}"
+
+
+def indexar_por_id(dados):
+    """Resposta de /players?filter[...] -> {account_id: item}; None se a chamada falhou."""
+    if dados is None:
+        return None
+    return {p["id"]: p for p in dados.get("data", [])}
+
+
+def ausentes(grupo, por_id):
+    """ids do grupo que não voltaram numa resposta válida; chamada falha não conta como ausência."""
+    if por_id is None:
+        return []
+    return [account_id for account_id in grupo if account_id not in por_id]
+
+
+def resolver_pendentes(cursor, registro, get_json):
+    """Resolve por nome os nicks marcados e grava no cadastro.
+
+    Retorna nick -> account_id. Quem não for encontrado pelo nome (ex.: trocou
+    de nick no jogo) continua com o account_id gravado, se houver.
+    """
+    pendentes = [nick for nick, (_, pendente) in registro.items() if pendente]
+    registro = {nick: account_id for nick, (account_id, _) in registro.items()}
+    if not pendentes:
+        return registro
+
+    print(f"🔎 Resolvendo account_id de {len(pendentes)} jogador(es)...")
+    resolvidos = set()
+    for grupo in lotes(pendentes):
+        for p in (indexar_por_id(get_json(url_por_nomes(grupo))) or {}).values():
+            nick = p["attributes"]["name"]
+            if nick not in registro:
+                continue
+            # Conta que já estava com outro nick (ex.: jogador recadastrado após trocar de nome)
+            cursor.execute(
+                "UPDATE players SET account_id = NULL, ativo = FALSE WHERE account_id = %s AND nick <> %s RETURNING nick",
+                (p["id"], nick)
+            )
+            for (antigo,) in cursor.fetchall():
+                print(f"🔀 {antigo} desativado: a conta agora está cadastrada como {nick}")
+            cursor.execute(
+                "UPDATE players SET account_id = %s, nick_resolvido = nick, resolvido_em = NOW() WHERE nick = %s",
+                (p["id"], nick)
+            )
+            registro[nick] = p["id"]
+            resolvidos.add(nick)
+
+    for nick in pendentes:
+        if nick in resolvidos:
+            continue
+        if registro[nick] is None:
+            print(f"⚠️ {nick} não encontrado na API — verifique o nick no cadastro")
+        else:
+            print(f"⚠️ {nick} não encontrado pelo nome — mantendo o account_id cadastrado")
+    return registro
+
+
+def marcar_para_resolver(cursor, nicks):
+    """Nicks cujo id não voltou na busca: serão resolvidos por nome na próxima execução."""
+    if nicks:
+        cursor.execute(
+            "UPDATE players SET nick_resolvido = NULL WHERE nick = ANY(%s)",
+            (list(nicks),)
+        )
+        print(f"⚠️ {len(nicks)} jogador(es) não encontrados pelo id: {', '.join(sorted(nicks))}")
+
+
+def temporada_atual(cursor, get_json, ttl_horas=TTL_TEMPORADA_H):
+    """Id da temporada atual, de cache_api enquanto estiver na validade.
+
+    Se /seasons falhar, usa o último valor conhecido mesmo vencido.
+    """
+    cursor.execute("""
+    SELECT valor, atualizado_em > NOW() - make_interval(hours => %s)
+    FROM cache_api WHERE chave = 'temporada_atual'
+    """, (ttl_horas,))
+    linha = cursor.fetchone()
+    if linha and linha[1]:
+        return linha[0]
+
+    dados = get_json(f"{BASE_URL}/seasons")
+    atual = next(
+        (s for s in (dados or {}).get("data", []) if s["attributes"]["isCurrentSeason"]),
+        None
+    )
+    if atual is None:
+        if linha:
+            print("⚠️ /seasons indisponível — usando a última temporada conhecida")
+            return linha[0]
+        return ""
+
+    cursor.execute("""
+    INSERT INTO cache_api (chave, valor, atualizado_em) VALUES ('temporada_atual', %s, NOW())
+    ON CONFLICT (chave) DO UPDATE SET valor = EXCLUDED.valor, atualizado_em = EXCLUDED.atualizado_em
+    """, (atual["id"],))
+    return atual["id"]
+
+
+if __name__ == "__main__":
+    import psycopg2
+    from pubg_api import cliente_padrao
+
+    parser = argparse.ArgumentParser(description="Cadastro de jogadores do squad")
+    parser.add_argument("--listar", action="store_true", help="mostra o cadastro")
+    parser.add_argument("--adicionar", nargs="+", metavar="NICK", default=[],
+                        help="cadastra (ou reativa) nicks e resolve o account_id")
+    parser.add_argument("--desativar", nargs="+", metavar="NICK", default=[],
+                        help="tira nicks das próximas execuções sem apagar o histórico")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(os.environ.get("DATABASE_URL"))
+    cursor = conn.cursor()
+    garantir_registro(cursor)
+
+    if args.adicionar:
+        execute_values(cursor, """
+        INSERT INTO players (nick) VALUES %s
+        ON CONFLICT (nick) DO UPDATE SET ativo = TRUE
+        """, [(nick,) for nick in args.adicionar])
+        registro = resolver_pendentes(cursor, carregar_registro(cursor), cliente_padrao().get_json)
+        for nick in args.adicionar:
+            print(f"➕ {nick}: {registro.get(nick) or 'sem account_id'}")
+
+    if args.desativar:
+        cursor.execute(
+            "UPDATE players SET ativo = FALSE WHERE nick = ANY(%s) RETURNING nick",
+            (args.desativar,)
+        )
+        for (nick,) in cursor.fetchall():
+            print(f"➖ {nick} desativado")
+
+    conn.commit()
+
+    if args.listar:
+        cursor.execute("SELECT nick, account_id, ativo, resolvido_em FROM players ORDER BY ativo DESC, nick")
+        for nick, account_id, ativo, resolvido_em in cursor.fetchall():
+            print(f"{'✅' if ativo else '⛔'} {nick:<20} {account_id or '-':<42} {resolvido_em or ''}")
+
+    conn.close()
@@ -0,0 +1,102 @@
+# resumo_partidas.py
+# Leitura projetada do payload de /matches/{id}. O documento JSON:API traz
+# ~100 participantes, rosters e assets; os importadores só usam três atributos
+# da partida e algumas stats de poucos jogadores. Aqui sai só isso, em tuplas.
+import os
+import json
+from collections import namedtuple
+
+try:
+    import ijson
+except ImportError:  # Opcional: sem ijson o payload é lido inteiro com json
+    ijson = None
+
+# Abaixo disso (bytes no disco) json.load + projeção é mais rápido que o ijson;
+# o streaming só compensa em payloads grandes, onde evita montar o documento todo
+STREAMING_MIN_BYTES = int(os.environ.get("PUBG_STREAMING_MIN_KB", 256)) * 1024
+
+# Stats de participante usadas pelo anti-casual, com o valor quando faltam
+PADROES_STATS = {
+    "kills": 0,
+    "damageDealt": 0,
+    "winPlace": 99,
+    "assists": 0,
+    "headshotKills": 0,
+    "revives": 0,
+    "longestKill": 0,
+}
+
+StatsJogador = namedtuple("StatsJogador", list(PADROES_STATS))
+ResumoPartida = namedtuple("ResumoPartida", ["created_at", "game_mode", "match_type", "humanos", "stats_por_id"])
+
+_ATRIBUTOS = {"createdAt", "gameMode", "matchType"}
+
+# Payload truncado ou fora do formato esperado
+ERROS_PAYLOAD = (ValueError, KeyError, TypeError) + ((ijson.JSONError,) if ijson else ())
+
+
+def _stats_jogador(stats):
+    return StatsJogador(*(
+        padrao if stats.get(campo) is None else stats[campo]
+        for campo, padrao in PADROES_STATS.items()
+    ))
+
+
+def _montar(atributos, participantes, ids):
+    """participantes: iterável de dicts ``stats``; guarda só os de ``ids`` (None = todos)."""
+    contas = set()
+    stats_por_id = {}
+    for stats in participantes:
+        player_id = stats.get("playerId")
+        if (player_id or "").startswith("account."):
+            contas.add(player_id)
+        if ids is None or player_id in ids:
+            stats_por_id[player_id] = _stats_jogador(stats)
+    return ResumoPartida(
+        atributos.get("createdAt"),
+        atributos.get("gameMode"),
+        atributos.get("matchType"),
+        len(contas),
+        stats_por_id,
+    )
+
+
+def _participantes(included):
+    for item in included:
+        if item.get("type") == "participant":
+            yield item["attributes"]["stats"]
+
+
+def resumir(dados, ids=None):
+    """Resumo a partir do documento já decodificado."""
+    return _montar(dados["data"]["attributes"], _participantes(dados.get("included", [])), ids)
+
+
+def resumir_bytes(bruto, ids=None):
+    # Com o payload inteiro na memória, json.loads (C) é mais rápido que o ijson
+    return resumir(json.loads(bruto), ids)
+
+
+def resumir_arquivo(abrir, ids=None, tamanho=None):
+    """Resumo lido de um arquivo (ex.: o .json.gz do cache).
+
+    Com ijson e ``tamanho`` >= STREAMING_MIN_BYTES o arquivo é lido em streaming:
+    ``abrir`` devolve um novo arquivo binário a cada chamada, os atributos da
+    partida vêm antes de "included" e a primeira leitura para assim que os acha.
+    Nos demais casos o arquivo é lido inteiro e só o resumo fica na memória.
+    """
+    if ijson is None or (tamanho or 0) < STREAMING_MIN_BYTES:
+        with abrir() as f:
+            return resumir(json.load(f), ids)
+
+    atributos = {}
+    with abrir() as f:
+        for chave, valor in ijson.kvitems(f, "data.attributes", use_float=True):
+            if chave in _ATRIBUTOS:
+                atributos[chave] = valor
+                if len(atributos) == len(_ATRIBUTOS):
+                    break
+
+    with abrir() as f:
+        itens = ijson.items(f, "included.item", use_float=True)
+        return _montar(atributos, _participantes(itens), ids)